@@ -162,6 +162,26 @@ class Settings:
         self.image_generation_timeout = 90  # Seconds per image
         self.tts_generation_timeout = 30  # Seconds per TTS
         self.max_concurrent_images = 3  # Limit concurrent image generation
+        # Panel image calls in flight at once; the default covers all six panels
+        self.max_parallel_panels = int(os.getenv("MAX_PARALLEL_PANELS", "6"))
+
+        # Voice agent: local VAD (opt-in) replaces Gemini's automatic activity
+        # detection; thresholds are mic RMS as a fraction of int16 full scale
+        self.voice_local_vad = os.getenv(
+            "VOICE_LOCAL_VAD", "false"
+        ).strip().lower() in {
+            "1",
+            "true",
+            "yes",
+            "on",
+        }
+        self.voice_vad_on_threshold = float(os.getenv("VOICE_VAD_ON_THRESHOLD", "0.02"))
+        self.voice_vad_off_threshold = float(
+            os.getenv("VOICE_VAD_OFF_THRESHOLD", "0.01")
+        )
+        self.voice_vad_hangover_ms = int(os.getenv("VOICE_VAD_HANGOVER_MS", "300"))
+        # Audio kept from before speech onset and sent right after activity_start
+        self.voice_vad_preroll_ms = int(os.getenv("VOICE_VAD_PREROLL_MS", "300"))
 
         # Auth settings - Prioritize Secret Manager for sensitive data
         # Use Secret Manager first, then fall back to environment variables
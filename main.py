@@ -333,11 +333,22 @@ async def simple_health():
 if __name__ == "__main__":
     import uvicorn
 
-    logger.info(f"Starting server on {settings.api_host}:{settings.api_port}")
+    # uvloop speeds up the websocket-heavy voice agent; it has no Windows build
+    try:
+        import uvloop  # noqa: F401
+
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+
+    logger.info(
+        f"Starting server on {settings.api_host}:{settings.api_port} ({loop} loop)"
+    )
     uvicorn.run(
         "main:app",
         host=settings.api_host,
         port=settings.api_port,
         reload=settings.debug,
         log_level="info",
+        loop=loop,
     )
@@ -11,6 +11,7 @@ from datetime import datetime, timedelta
 import os
 
 from jose import jwt
+from loguru import logger
 from config.settings import settings
 from models.db import get_db
 from models.user import User
@@ -53,8 +54,8 @@ def simple_google_token_verification(token: str, expected_client_id: str) -> dic
     Simplified Google ID token verification using jose library without cryptographic verification.
     This bypasses Google's strict audience validation and CRLF issues.
     """
-    print(f"[SIMPLE AUTH] Starting token verification")
-    print(f"[SIMPLE AUTH] Expected client ID: {expected_client_id[:20]}...")
+    logger.debug(f"[SIMPLE AUTH] Starting token verification")
+    logger.debug(f"[SIMPLE AUTH] Expected client ID: {expected_client_id[:20]}...")
 
     try:
         # Decode without signature verification to bypass crypto dependency issues
@@ -69,7 +70,7 @@ def simple_google_token_verification(token: str, expected_client_id: str) -> dic
                 "verify_iss": False,  # We'll check issuer manually
             },
         )
-        print(f"[SIMPLE AUTH] Token decoded successfully")
+        logger.debug(f"[SIMPLE AUTH] Token decoded successfully")
 
         # Manual validations
         current_time = int(datetime.utcnow().timestamp())
@@ -77,24 +78,24 @@ def simple_google_token_verification(token: str, expected_client_id: str) -> dic
         # Check expiry
         exp = payload.get("exp", 0)
         if current_time >= exp:
-            print(f"[SIMPLE AUTH] Token expired: {current_time} >= {exp}")
+            logger.warning(f"[SIMPLE AUTH] Token expired: {current_time} >= {exp}")
             raise ValueError("Token has expired")
 
         # Check issuer
         iss = payload.get("iss", "")
         if iss not in ["accounts.google.com", "https://accounts.google.com"]:
-            print(f"[SIMPLE AUTH] Invalid issuer: {iss}")
+            logger.warning(f"[SIMPLE AUTH] Invalid issuer: {iss}")
             raise ValueError(f"Invalid issuer: {iss}")
 
         # Check audience (sanitized comparison)
         token_aud = payload.get("aud", "").strip()
         clean_expected = expected_client_id.strip()
 
-        print(f"[SIMPLE AUTH] Token audience: '{token_aud}'")
-        print(f"[SIMPLE AUTH] Expected audience: '{clean_expected}'")
+        logger.debug(f"[SIMPLE AUTH] Token audience: '{token_aud}'")
+        logger.debug(f"[SIMPLE AUTH] Expected audience: '{clean_expected}'")
 
         if token_aud != clean_expected:
-            print(f"[SIMPLE AUTH] Audience mismatch")
+            logger.warning(f"[SIMPLE AUTH] Audience mismatch")
             raise ValueError(f"Invalid audience: {token_aud}")
 
         # Check essential claims
@@ -102,11 +103,11 @@ def simple_google_token_verification(token: str, expected_client_id: str) -> dic
         if not email:
             raise ValueError("Email not present in token")
 
-        print(f"[SIMPLE AUTH] All validations passed for email: {email}")
+        logger.debug(f"[SIMPLE AUTH] All validations passed for email: {email}")
         return payload
 
     except Exception as e:
-        print(f"[SIMPLE AUTH] Verification failed: {str(e)}")
+        logger.warning(f"[SIMPLE AUTH] Verification failed: {str(e)}")
         raise e
 
 
@@ -139,15 +140,15 @@ def google_sign_in(
     payload: GoogleAuthRequest, response: Response, db: Session = Depends(get_db)
 ):
     """Google OAuth authentication with custom JWT verification"""
-    print(f"[AUTH START] Google sign-in attempt started")
+    logger.debug(f"[AUTH START] Google sign-in attempt started")
 
     if not payload.credential:
-        print(f"[AUTH ERROR] Missing credential token")
+        logger.warning(f"[AUTH ERROR] Missing credential token")
         raise HTTPException(status_code=400, detail="Missing credential token")
 
     try:
         if not settings.google_client_id:
-            print(f"[AUTH ERROR] GOOGLE_CLIENT_ID is not configured")
+            logger.error(f"[AUTH ERROR] GOOGLE_CLIENT_ID is not configured")
             raise HTTPException(
                 status_code=500,
                 detail="GOOGLE_CLIENT_ID is not configured on the server",
@@ -157,13 +158,13 @@ def google_sign_in(
         clean_client_id = settings.google_client_id.strip()
 
         # Debug logging
-        print(f"[AUTH DEBUG] Client ID length: {len(clean_client_id)}")
-        print(f"[AUTH DEBUG] Token length: {len(payload.credential)}")
-        print(f"[AUTH DEBUG] Starting SIMPLE token verification...")
+        logger.debug(f"[AUTH DEBUG] Client ID length: {len(clean_client_id)}")
+        logger.debug(f"[AUTH DEBUG] Token length: {len(payload.credential)}")
+        logger.debug(f"[AUTH DEBUG] Starting SIMPLE token verification...")
 
         # Use our simple verification to eliminate Google library issues
         idinfo = simple_google_token_verification(payload.credential, clean_client_id)
-        print(f"[AUTH SUCCESS] Simple token verification completed")
+        logger.debug(f"[AUTH SUCCESS] Simple token verification completed")
 
         # Extract user info
         email = idinfo.get("email")
@@ -172,10 +173,10 @@ def google_sign_in(
         google_sub = idinfo.get("sub")
 
         if not email:
-            print(f"[AUTH ERROR] Email not present in token")
+            logger.warning(f"[AUTH ERROR] Email not present in token")
             raise HTTPException(status_code=400, detail="Email not present in token")
 
-        print(f"[AUTH DEBUG] User info extracted - email: {email}, name: {name}")
+        logger.debug(f"[AUTH DEBUG] User info extracted - email: {email}, name: {name}")
 
         # Upsert user
         user = db.query(User).filter(User.email == email).first()
@@ -197,7 +198,7 @@ def google_sign_in(
 
         # Create session JWT
         token = create_access_token(subject=str(user.id))
-        print(f"[AUTH SUCCESS] Authentication completed successfully for {email}")
+        logger.info(f"[AUTH SUCCESS] Authentication completed successfully for {email}")
 
         # Add headers to prove this revision is serving traffic
         response.headers["X-Revision"] = os.getenv("K_REVISION", "unknown")
@@ -216,7 +217,7 @@ def google_sign_in(
 
     except ValueError as e:
         # Invalid token - this will show our simple error format
-        print(f"[AUTH] Invalid Google token verification error: {e}")
+        logger.warning(f"[AUTH] Invalid Google token verification error: {e}")
         raise HTTPException(status_code=401, detail=f"Invalid Google token: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Auth error: {e}")
@@ -26,6 +26,7 @@ from services.voice_agent_service import (
     voice_agent,
     enhanced_voice_agent,
     EnhancedWebSocketVoiceAgent,
+    PERSONA_SYSTEM_INSTRUCTION,
 )
 from sqlalchemy.orm import Session
 from models.db import get_db
@@ -339,9 +340,9 @@ async def get_session_status(session_id: str) -> Dict[str, Any]:
             status_data.update(
                 {
                     "websocket_status": (
-                        "connected" if ws_session["is_running"] else "disconnected"
+                        "connected" if ws_session.is_running else "disconnected"
                     ),
-                    "websocket_buffer_size": len(ws_session.get("audio_buffer", [])),
+                    "websocket_buffer_size": ws_session.audio_buffer_len,
                 }
             )
 
@@ -369,14 +370,16 @@ async def list_active_sessions() -> Dict[str, Any]:
 
         for session_id in all_session_ids:
             router_data = active_sessions.get(session_id, {})
-            websocket_data = voice_agent.active_sessions.get(session_id, {})
+            websocket_data = voice_agent.active_sessions.get(session_id)
 
             sessions_summary.append(
                 {
                     "session_id": session_id,
                     "router_status": router_data.get("status", "unknown"),
                     "websocket_connected": session_id in voice_agent.active_sessions,
-                    "websocket_running": websocket_data.get("is_running", False),
+                    "websocket_running": bool(
+                        websocket_data and websocket_data.is_running
+                    ),
                     "user_id": router_data.get("user_id"),
                     "context": router_data.get("context"),
                     "model": router_data.get("model"),
@@ -439,6 +442,7 @@ async def voice_agent_info() -> Dict[str, Any]:
             "channels": 1,
             "format": "16-bit PCM",
             "chunk_duration_ms": 100,
+            "output_framing": "binary frames: 0x01 tag byte + raw PCM",
         },
         "timestamp": create_timestamp(),
     }
@@ -533,14 +537,7 @@ async def get_persona_config() -> Dict[str, Any]:
     """Get the current persona configuration options."""
     return {
         "default_persona": {
-            "system_instruction": (
-                "You are a compassionate mindfulness coach and mental wellness assistant. "
-                "IMPORTANT: You MUST speak ONLY in English. Do not use any other language under any circumstances. "
-                "Provide calming guidance, emotional support, and helpful meditation techniques. "
-                "Speak in a gentle, warm, and understanding tone. "
-                "Offer breathing exercises, meditation guidance, and positive affirmations when appropriate. "
-                "Keep responses conversational and natural."
-            ),
+            "system_instruction": PERSONA_SYSTEM_INSTRUCTION,
             "temperature": 0.6,
             "top_p": 0.9,
             "language_code": "en-US",
@@ -623,7 +620,7 @@ async def get_session_persona_info(
             )
 
         session_data = active_sessions[session_id]
-        websocket_data = voice_agent.active_sessions.get(session_id, {})
+        websocket_data = voice_agent.active_sessions.get(session_id)
 
         return {
             "session_id": session_id,
@@ -632,7 +629,9 @@ async def get_session_persona_info(
             "system_instruction": session_data.get("system_instruction"),
             "context": session_data.get("context"),
             "model": session_data.get("model"),
-            "config_used": websocket_data.get("config_used", "unknown"),
+            "config_used": (
+                websocket_data.config_used if websocket_data else "unknown"
+            ),
             "websocket_connected": session_id in voice_agent.active_sessions,
             "status": session_data.get("status"),
             "started_at": session_data.get("started_at"),
@@ -675,8 +674,9 @@ async def voice_websocket_endpoint(
 
         # ✅ FIXED: Use the correct method signature - no model_name parameter
         logger.info(f"🎤 Creating voice session: {session_id}")
+        # Resume only with the handle this client was sent, never by session id alone
         success = await voice_agent.create_session(
-            session_id, websocket
+            session_id, websocket, websocket.query_params.get("resume_handle")
         )  # ✅ Correct call
 
         if not success:
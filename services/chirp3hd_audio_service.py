@@ -31,28 +31,30 @@ class Chirp3HDAudioService:
     def _select_voice(self, user_age: int, user_gender: str) -> Dict[str, str]:
         """Select appropriate voice based on user age and gender."""
         try:
+            gender = user_gender.lower()
+
             # Age-based voice selection
             if user_age <= 18:
                 # Teen voices
-                if user_gender.lower() in ["female", "woman", "girl"]:
+                if gender in ["female", "woman", "girl"]:
                     voice_name = "en-US-Journey-F"  # Young female voice
-                elif user_gender.lower() in ["male", "man", "boy"]:
+                elif gender in ["male", "man", "boy"]:
                     voice_name = "en-US-Journey-D"  # Young male voice
                 else:
                     voice_name = "en-US-Journey-F"  # Default to female for non-binary
             elif user_age <= 30:
                 # Young adult voices
-                if user_gender.lower() in ["female", "woman", "girl"]:
+                if gender in ["female", "woman", "girl"]:
                     voice_name = "en-US-Journey-F"
-                elif user_gender.lower() in ["male", "man", "boy"]:
+                elif gender in ["male", "man", "boy"]:
                     voice_name = "en-US-Journey-D"
                 else:
                     voice_name = "en-US-Journey-O"  # Neutral voice
             else:
                 # Adult voices
-                if user_gender.lower() in ["female", "woman", "girl"]:
+                if gender in ["female", "woman", "girl"]:
                     voice_name = "en-US-Studio-O"  # Mature female voice
-                elif user_gender.lower() in ["male", "man", "boy"]:
+                elif gender in ["male", "man", "boy"]:
                     voice_name = "en-US-Studio-M"  # Mature male voice
                 else:
                     voice_name = "en-US-Studio-O"  # Default to neutral
@@ -4,12 +4,20 @@ Mandatory feature for proper dialogue generation.
 """
 
 import asyncio
+import re
 import time
 from typing import List, Dict, Any, Tuple
 from loguru import logger
 from google.cloud import texttospeech
 from config.settings import settings
 
+# Compiled once at import; _clean_text_for_tts runs for every panel dialogue.
+DIALOGUE_PREFIX_RE = re.compile(r'^dialogue[\s_]*text[\s_]*:\s*["\']?', re.IGNORECASE)
+BRACKETED_RE = re.compile(r"\[.*?\]")
+PARENTHESIZED_RE = re.compile(r"\(.*?\)")
+UNSPOKEN_SYMBOL_RE = re.compile(r'[^\w\s\.,!?;:\'"-]')
+WHITESPACE_RE = re.compile(r"\s+")
+
 
 class TTSMetrics:
     """Track TTS service performance."""
@@ -46,38 +54,40 @@ class Chirp3HDTTSService:
     def _select_voice(self, user_age: int, user_gender: str) -> Dict[str, str]:
         """Select appropriate voice based on user age and gender with Chirp 3 HD voices."""
         try:
+            gender = user_gender.lower()
+
             # Age-based voice selection with Chirp 3 HD voice mapping
             # Age ranges: 13-17 (teen), 18-25 (young-adult), 26-35 (adult)
 
             if user_age <= 17:  # 13-17 age range
-                if user_gender.lower() in ["female", "woman", "girl"]:
+                if gender in ["female", "woman", "girl"]:
                     voice_name = "en-IN-Chirp3-HD-Kore"  # Female teen voice
-                elif user_gender.lower() in ["male", "man", "boy"]:
+                elif gender in ["male", "man", "boy"]:
                     voice_name = "en-IN-Chirp3-HD-Puck"  # Male teen voice
                 else:
                     voice_name = "en-IN-Chirp3-HD-Kore"  # Default to female
 
             elif user_age <= 25:  # 18-25 age range
-                if user_gender.lower() in ["female", "woman", "girl"]:
+                if gender in ["female", "woman", "girl"]:
                     voice_name = "en-IN-Chirp3-HD-Erinome"  # Female young adult voice
-                elif user_gender.lower() in ["male", "man", "boy"]:
+                elif gender in ["male", "man", "boy"]:
                     voice_name = "en-IN-Chirp3-HD-Achird"  # Male young adult voice
                 else:
                     voice_name = "en-IN-Chirp3-HD-Erinome"  # Default to female
 
             elif user_age <= 35:  # 26-35 age range
-                if user_gender.lower() in ["female", "woman", "girl"]:
+                if gender in ["female", "woman", "girl"]:
                     voice_name = "en-IN-Chirp3-HD-Callirrhoe"  # Female adult voice
-                elif user_gender.lower() in ["male", "man", "boy"]:
+                elif gender in ["male", "man", "boy"]:
                     voice_name = "en-IN-Chirp3-HD-Alnilam"  # Male adult voice
                 else:
                     voice_name = "en-IN-Chirp3-HD-Callirrhoe"  # Default to female
 
             else:
                 # Fallback for ages above 35 (shouldn't happen with new frontend but keeping for safety)
-                if user_gender.lower() in ["female", "woman", "girl"]:
+                if gender in ["female", "woman", "girl"]:
                     voice_name = "en-IN-Chirp3-HD-Callirrhoe"  # Use adult female voice
-                elif user_gender.lower() in ["male", "man", "boy"]:
+                elif gender in ["male", "man", "boy"]:
                     voice_name = "en-IN-Chirp3-HD-Alnilam"  # Use adult male voice
                 else:
                     voice_name = "en-IN-Chirp3-HD-Callirrhoe"  # Default to female
@@ -104,20 +114,16 @@ class Chirp3HDTTSService:
 
     def _clean_text_for_tts(self, text: str) -> str:
         """Clean text for better TTS pronunciation and 8-10 second duration."""
-        import re
-
         # Remove the "dialogue text: " or "dialogue_text: " prefix that may be included by the LLM
         # This handles both space and underscore variations: "dialogue text:", "dialogue_text:", etc.
-        text = re.sub(
-            r'^dialogue[\s_]*text[\s_]*:\s*["\']?', "", text, flags=re.IGNORECASE
-        )
+        text = DIALOGUE_PREFIX_RE.sub("", text)
 
         # Remove quotes and special characters that don't help with narration
         text = text.strip("\"'")
 
         # Remove action descriptions in brackets/parentheses
-        text = re.sub(r"\[.*?\]", "", text)
-        text = re.sub(r"\(.*?\)", "", text)
+        text = BRACKETED_RE.sub("", text)
+        text = PARENTHESIZED_RE.sub("", text)
 
         # Replace underscores with spaces (common issue causing "underscore" to be read)
         text = text.replace("_", " ")
@@ -140,7 +146,7 @@ class Chirp3HDTTSService:
         text = text.replace("`", "")
 
         # Handle multiple consecutive symbols or numbers
-        text = re.sub(r'[^\w\s\.,!?;:\'"-]', " ", text)
+        text = UNSPOKEN_SYMBOL_RE.sub(" ", text)
 
         # Replace em dashes and special punctuation with natural pauses
         text = text.replace("—", ", ")
@@ -149,7 +155,7 @@ class Chirp3HDTTSService:
         text = text.replace("..", ". ")
 
         # Clean up multiple spaces and normalize punctuation
-        text = re.sub(r"\s+", " ", text)
+        text = WHITESPACE_RE.sub(" ", text)
         text = text.replace(" ,", ",").replace(" .", ".")
         text = text.replace(" !", "!").replace(" ?", "?")
         text = text.replace(" ;", ";").replace(" :", ":")
@@ -168,7 +174,7 @@ class Chirp3HDTTSService:
                 text += "."
 
         # Final cleanup to ensure natural flow
-        text = re.sub(r"\s+", " ", text).strip()
+        text = WHITESPACE_RE.sub(" ", text).strip()
 
         logger.info(f"Cleaned TTS text: '{text}'")
         return text
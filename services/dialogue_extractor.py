@@ -7,6 +7,48 @@ import json
 from typing import Dict, List, Any, Optional
 from loguru import logger
 
+# Extraction patterns, compiled once at import instead of per response.
+CODE_FENCE_RE = re.compile(r"```[a-zA-Z]*\n?|```")
+QUOTED_DIALOGUE_RE = re.compile(r'PANEL_(\d+):\s*dialogue_text:\s*"([^"]*)"', re.DOTALL)
+UNQUOTED_DIALOGUE_RE = re.compile(
+    r"PANEL_(\d+):\s*dialogue_text:\s*([^\n]+)", re.DOTALL
+)
+FLEXIBLE_DIALOGUE_RE = re.compile(
+    r'PANEL\s*(\d+)[:\s]*.*?dialogue[_\s]*text[:\s]*["\']?([^"\'\n]+)["\']?',
+    re.DOTALL | re.IGNORECASE,
+)
+SECTION_QUOTED_DIALOGUE_RE = re.compile(
+    r'dialogue[_\s]*text\s*:\s*"([\s\S]*?)"\s*(?:\n\s*\w+\s*:|$)', re.IGNORECASE
+)
+SECTION_BARE_DIALOGUE_RE = re.compile(
+    r"dialogue[_\s]*text\s*:\s*([\s\S]*?)(?:\n\s*\n|\n\s*\w+\s*:|$)", re.IGNORECASE
+)
+ENCLOSING_QUOTE_RE = re.compile(r'^["\']|["\']$')
+LINE_BREAK_RE = re.compile(r"\s*\n\s*")
+NUMBERED_DIALOGUE_RE = re.compile(r"(\d+)[\.:\s]+([^0-9\n][^\n]{20,})", re.DOTALL)
+
+# Section start/end markers for panels 1-6 (PANEL_1, PANEL 1 or Panel 1).
+PANEL_SECTION_RES = {
+    i: (
+        re.compile(rf"(?:PANEL[_\s]|Panel\s){i}\s*:\s*", re.IGNORECASE),
+        re.compile(
+            rf"(?:PANEL[_\s]|Panel\s){i+1}\s*:\s*|CHARACTER_SHEET\s*:|PROP_SHEET\s*:|STYLE_GUIDE\s*:",
+            re.IGNORECASE,
+        ),
+    )
+    for i in range(1, 7)
+}
+
+# Meaningful fallback content, formatted only for panels that need it.
+FALLBACK_DIALOGUE_TEMPLATES = (
+    "Meet {name}. They're feeling {mood} today, but deep inside burns a desire to achieve {dream}. Every great journey begins with a single step forward.",
+    "{name} faces the challenge ahead. The path to {dream} isn't easy, but they've come too far to give up now. Sometimes the hardest battles are the ones we fight within ourselves.",
+    "Taking a moment to breathe, {name} reflects on how far they've already come. Even when feeling {mood}, there's strength in acknowledging both struggles and progress.",
+    "In this moment of clarity, {name} discovers something important. Their {dream} isn't just about the destination - it's about becoming the person they're meant to be along the way.",
+    "With newfound determination, {name} takes action. They realize that being {mood} doesn't define them - it's just one part of their story, and they have the power to write the next chapter.",
+    "Looking back on the journey, {name} sees how much they've grown. The road to {dream} continues, but now they know they have the strength to face whatever comes next. Hope lights the way forward.",
+)
+
 
 class DialogueExtractor:
     """
@@ -26,21 +68,19 @@ class DialogueExtractor:
         """
         # Normalize line endings and strip code fences/surrounding markdown for more reliable regex
         cleaned = text.replace("\r\n", "\n").replace("\r", "\n")
-        cleaned = re.sub(r"```[a-zA-Z]*\n?|```", "", cleaned)
+        cleaned = CODE_FENCE_RE.sub("", cleaned)
 
         panels = {}
 
         # Strategy 1: Standard format with quotes
-        strategy1_pattern = r'PANEL_(\d+):\s*dialogue_text:\s*"([^"]*)"'
-        matches = re.findall(strategy1_pattern, cleaned, re.DOTALL)
+        matches = QUOTED_DIALOGUE_RE.findall(cleaned)
         for panel_num, dialogue in matches:
             if dialogue.strip() and len(dialogue.strip()) > 10:
                 panels[int(panel_num)] = dialogue.strip()
 
         # Strategy 2: Format without quotes
         if len(panels) < 6:
-            strategy2_pattern = r"PANEL_(\d+):\s*dialogue_text:\s*([^\n]+)"
-            matches = re.findall(strategy2_pattern, cleaned, re.DOTALL)
+            matches = UNQUOTED_DIALOGUE_RE.findall(cleaned)
             for panel_num, dialogue in matches:
                 panel_int = int(panel_num)
                 if (
@@ -52,10 +92,7 @@ class DialogueExtractor:
 
         # Strategy 3: More flexible pattern
         if len(panels) < 6:
-            strategy3_pattern = (
-                r'PANEL\s*(\d+)[:\s]*.*?dialogue[_\s]*text[:\s]*["\']?([^"\'\n]+)["\']?'
-            )
-            matches = re.findall(strategy3_pattern, cleaned, re.DOTALL | re.IGNORECASE)
+            matches = FLEXIBLE_DIALOGUE_RE.findall(cleaned)
             for panel_num, dialogue in matches:
                 panel_int = int(panel_num)
                 if (
@@ -70,19 +107,14 @@ class DialogueExtractor:
             for i in range(1, 7):
                 if i in panels:
                     continue
+                start_re, end_re = PANEL_SECTION_RES[i]
                 # Find the start of the panel section allowing PANEL_1 or PANEL 1 or Panel 1
-                start_match = re.search(
-                    rf"(?:PANEL[_\s]|Panel\s){i}\s*:\s*", cleaned, re.IGNORECASE
-                )
+                start_match = start_re.search(cleaned)
                 if not start_match:
                     continue
                 start_idx = start_match.end()
                 # Find the end of this panel section (next PANEL or end of text)
-                end_match = re.search(
-                    rf"(?:PANEL[_\s]|Panel\s){i+1}\s*:\s*|CHARACTER_SHEET\s*:|PROP_SHEET\s*:|STYLE_GUIDE\s*:",
-                    cleaned[start_idx:],
-                    re.IGNORECASE,
-                )
+                end_match = end_re.search(cleaned[start_idx:])
                 end_idx = start_idx + (
                     end_match.start() if end_match else len(cleaned) - start_idx
                 )
@@ -90,31 +122,22 @@ class DialogueExtractor:
 
                 # Within section, look for dialogue_text value that may span multiple lines until a blank line or another key
                 # Pattern 1: dialogue_text: "..." (possibly multi-line within quotes)
-                m = re.search(
-                    r'dialogue[_\s]*text\s*:\s*"([\s\S]*?)"\s*(?:\n\s*\w+\s*:|$)',
-                    section,
-                    re.IGNORECASE,
-                )
+                m = SECTION_QUOTED_DIALOGUE_RE.search(section)
                 if not m:
                     # Pattern 2: dialogue_text: (value on next lines) until double newline or next key
-                    m = re.search(
-                        r"dialogue[_\s]*text\s*:\s*([\s\S]*?)(?:\n\s*\n|\n\s*\w+\s*:|$)",
-                        section,
-                        re.IGNORECASE,
-                    )
+                    m = SECTION_BARE_DIALOGUE_RE.search(section)
                 if m:
                     dialogue_text = m.group(1).strip()
                     # Clean enclosing quotes or bullet markers
-                    dialogue_text = re.sub(r'^["\']|["\']$', "", dialogue_text)
+                    dialogue_text = ENCLOSING_QUOTE_RE.sub("", dialogue_text)
                     # Collapse whitespace and newlines to spaces
-                    dialogue_text = re.sub(r"\s*\n\s*", " ", dialogue_text)
+                    dialogue_text = LINE_BREAK_RE.sub(" ", dialogue_text)
                     if len(dialogue_text) > 10:
                         panels[i] = dialogue_text
 
         # Strategy 4: Look for numbered dialogue blocks
         if len(panels) < 6:
-            strategy4_pattern = r"(\d+)[\.:\s]+([^0-9\n][^\n]{20,})"
-            matches = re.findall(strategy4_pattern, cleaned, re.DOTALL)
+            matches = NUMBERED_DIALOGUE_RE.findall(cleaned)
             panel_counter = 1
             for num_str, dialogue in matches:
                 if panel_counter <= 6 and panel_counter not in panels:
@@ -147,23 +170,15 @@ class DialogueExtractor:
         dream = getattr(inputs, "dream", "their goals") if inputs else "their goals"
         mood = getattr(inputs, "mood", "uncertain") if inputs else "uncertain"
 
-        # Meaningful fallback content
-        fallback_dialogues = {
-            1: f"Meet {name}. They're feeling {mood} today, but deep inside burns a desire to achieve {dream}. Every great journey begins with a single step forward.",
-            2: f"{name} faces the challenge ahead. The path to {dream} isn't easy, but they've come too far to give up now. Sometimes the hardest battles are the ones we fight within ourselves.",
-            3: f"Taking a moment to breathe, {name} reflects on how far they've already come. Even when feeling {mood}, there's strength in acknowledging both struggles and progress.",
-            4: f"In this moment of clarity, {name} discovers something important. Their {dream} isn't just about the destination - it's about becoming the person they're meant to be along the way.",
-            5: f"With newfound determination, {name} takes action. They realize that being {mood} doesn't define them - it's just one part of their story, and they have the power to write the next chapter.",
-            6: f"Looking back on the journey, {name} sees how much they've grown. The road to {dream} continues, but now they know they have the strength to face whatever comes next. Hope lights the way forward.",
-        }
-
         for panel_num in range(1, 7):
             if panel_num in panels and len(panels[panel_num]) > 20:
                 # Use extracted dialogue if it's substantial
                 enhanced_panels[panel_num] = panels[panel_num]
             else:
                 # Use meaningful fallback
-                enhanced_panels[panel_num] = fallback_dialogues[panel_num]
+                enhanced_panels[panel_num] = FALLBACK_DIALOGUE_TEMPLATES[
+                    panel_num - 1
+                ].format(name=name, dream=dream, mood=mood)
                 logger.info(f"Using enhanced fallback dialogue for panel {panel_num}")
 
         return enhanced_panels
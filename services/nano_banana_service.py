@@ -6,6 +6,7 @@ Combines Gemini 2.5 Flash Image Preview with Google Cloud Storage.
 import os
 import base64
 import asyncio
+import re
 import time
 from typing import Optional, Dict, Any, List
 from loguru import logger
@@ -15,6 +16,10 @@ from google import genai
 from google.cloud import storage
 from config.settings import settings
 
+# Error message classifiers for panel generation retries.
+SERVER_OVERLOAD_ERROR_RE = re.compile(r"500|internal|overload", re.IGNORECASE)
+QUOTA_ERROR_RE = re.compile(r"quota|billing", re.IGNORECASE)
+
 
 class ServiceMetrics:
     """Track service performance and errors."""
@@ -279,8 +284,9 @@ Reference sheet for {char_name} ({char_gender}, {char_age}) in Studio Ghibli art
             logger.info("🚀 Starting staggered panel generation to avoid 500 errors...")
             panel_results = await asyncio.gather(*panel_tasks, return_exceptions=True)
 
-            # Process results
-            panel_urls = []
+            # Process results; fallbacks for failed panels are uploaded concurrently
+            panel_urls = list(panel_results)
+            fallback_tasks = {}
             for i, result in enumerate(panel_results):
                 if isinstance(result, Exception):
                     logger.error(f"Panel {i+1} generation failed: {result}")
@@ -290,12 +296,14 @@ Reference sheet for {char_name} ({char_gender}, {char_age}) in Studio Ghibli art
                         if len(str(result)) > 50
                         else str(result)
                     )
-                    fallback_url = await self._create_fallback_panel(
+                    fallback_tasks[i] = self._create_fallback_panel(
                         story_id, i + 1, error_msg
                     )
-                    panel_urls.append(fallback_url)
-                else:
-                    panel_urls.append(result)
+
+            if fallback_tasks:
+                fallback_urls = await asyncio.gather(*fallback_tasks.values())
+                for i, fallback_url in zip(fallback_tasks, fallback_urls):
+                    panel_urls[i] = fallback_url
 
             logger.info(
                 f"✅ Generated {len(panel_urls)} panel images with staggered timing"
@@ -410,11 +418,7 @@ Reference sheet for {char_name} ({char_gender}, {char_age}) in Studio Ghibli art
                 )
 
                 # Enhanced error handling for 500 errors
-                if (
-                    "500" in error_msg
-                    or "internal" in error_msg.lower()
-                    or "overload" in error_msg.lower()
-                ):
+                if SERVER_OVERLOAD_ERROR_RE.search(error_msg):
                     logger.warning(
                         f"🔄 Server overload detected for panel {panel_number}, will retry with backoff"
                     )
@@ -427,7 +431,7 @@ Reference sheet for {char_name} ({char_gender}, {char_age}) in Studio Ghibli art
                         logger.error(
                             f"❌ Panel {panel_number} failed after {max_retries} attempts due to persistent 500 errors"
                         )
-                elif "quota" in error_msg.lower() or "billing" in error_msg.lower():
+                elif QUOTA_ERROR_RE.search(error_msg):
                     logger.error(
                         f"Non-retryable quota error for panel {panel_number}: {e}"
                     )
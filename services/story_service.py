@@ -26,9 +26,25 @@ from utils.helpers import (
 from utils.retry_helpers import exponential_backoff_async
 from services.nano_banana_service import nano_banana_service
 from services.chirp3hd_tts_service import chirp3hd_tts_service as audio_service
-from services.streaming_parser import StreamingStoryGenerator
+from services.streaming_parser import (
+    StreamingStoryGenerator,
+    CHARACTER_SHEET_RE,
+    PROP_SHEET_RE,
+    STYLE_GUIDE_RE,
+)
 from services.gcs_storage_service import gcs_storage_service as storage_service
 
+# Six-panel emotional journey used when a panel has no usable dialogue;
+# only the requested panel is formatted.
+MEANINGFUL_DIALOGUE_TEMPLATES = (
+    "Meet {name}. Today they're feeling {mood}, but inside burns a powerful desire to {dream}. Every meaningful journey begins with acknowledging where we are and where we want to go.",
+    "{name} faces their greatest challenge: {inner_struggle}. The path to {dream} isn't easy, but they've come too far to give up. Sometimes our biggest obstacles are the stepping stones to our greatest growth.",
+    "Taking a deep breath, {name} reflects on their journey so far. Even feeling {mood} doesn't define who they are, it's just part of their human experience. In this quiet moment, clarity begins to emerge.",
+    "Suddenly, {name} remembers their {secret_weapon}. This isn't just a skill, it's their unique gift to the world. With renewed understanding, they see how this strength can help them overcome {inner_struggle}.",
+    "With determination rising, {name} takes action. They reach out to their {support_system} and use their {secret_weapon} to move toward {dream}. Each step forward builds their confidence.",
+    "Looking ahead with hope, {name} realizes the journey continues, but they're no longer the same person. They've grown stronger, wiser, and more connected to their true purpose of achieving {dream}.",
+)
+
 
 class StoryService:
     def __init__(self):
@@ -167,11 +183,11 @@ class StoryService:
                     STYLE_GUIDE:
                     {json.dumps(panel_data['style_guide'], indent=2)}
 
-                    dialogue_text: "{panel_data['dialogue_text']}"
-
                     GENERATED IMAGE PROMPT:
                     {image_prompt}
 
+                    dialogue_text: "{panel_data['dialogue_text']}"
+
                     Please refine and enhance the above image generation prompt for Panel {panel_num}.
                     """
 
@@ -238,19 +254,17 @@ class StoryService:
                 dialogues = {}
 
             # Extract character sheet
-            character_match = re.search(
-                r"CHARACTER_SHEET:\s*({.*?})", response, re.DOTALL
-            )
+            character_match = CHARACTER_SHEET_RE.search(response)
             character_sheet = (
                 json.loads(character_match.group(1)) if character_match else {}
             )
 
             # Extract prop sheet
-            prop_match = re.search(r"PROP_SHEET:\s*({.*?})", response, re.DOTALL)
+            prop_match = PROP_SHEET_RE.search(response)
             prop_sheet = json.loads(prop_match.group(1)) if prop_match else {}
 
             # Extract style guide
-            style_match = re.search(r"STYLE_GUIDE:\s*({.*?})", response, re.DOTALL)
+            style_match = STYLE_GUIDE_RE.search(response)
             style_guide = json.loads(style_match.group(1)) if style_match else {}
 
             # Extract each panel dialogue text using robust extractor first, then regex patterns as backup
@@ -350,19 +364,17 @@ class StoryService:
         secret_weapon = inputs.secretWeapon if inputs else "inner strength"
         support_system = inputs.supportSystem if inputs else "friends and family"
 
-        # Create meaningful 6-panel emotional journey
-        dialogue_map = {
-            1: f"Meet {name}. Today they're feeling {mood}, but inside burns a powerful desire to {dream}. Every meaningful journey begins with acknowledging where we are and where we want to go.",
-            2: f"{name} faces their greatest challenge: {inner_struggle}. The path to {dream} isn't easy, but they've come too far to give up. Sometimes our biggest obstacles are the stepping stones to our greatest growth.",
-            3: f"Taking a deep breath, {name} reflects on their journey so far. Even feeling {mood} doesn't define who they are, it's just part of their human experience. In this quiet moment, clarity begins to emerge.",
-            4: f"Suddenly, {name} remembers their {secret_weapon}. This isn't just a skill, it's their unique gift to the world. With renewed understanding, they see how this strength can help them overcome {inner_struggle}.",
-            5: f"With determination rising, {name} takes action. They reach out to their {support_system} and use their {secret_weapon} to move toward {dream}. Each step forward builds their confidence.",
-            6: f"Looking ahead with hope, {name} realizes the journey continues, but they're no longer the same person. They've grown stronger, wiser, and more connected to their true purpose of achieving {dream}.",
-        }
-
-        return dialogue_map.get(
-            panel_number,
-            f"{name} continues their meaningful journey toward {dream}, growing stronger with each challenge they overcome.",
+        if 1 <= panel_number <= len(MEANINGFUL_DIALOGUE_TEMPLATES):
+            template = MEANINGFUL_DIALOGUE_TEMPLATES[panel_number - 1]
+        else:
+            template = "{name} continues their meaningful journey toward {dream}, growing stronger with each challenge they overcome."
+        return template.format(
+            name=name,
+            dream=dream,
+            mood=mood,
+            inner_struggle=inner_struggle,
+            secret_weapon=secret_weapon,
+            support_system=support_system,
         )
 
     def _combine_ai_responses(
@@ -402,19 +414,17 @@ class StoryService:
             panels = []
 
             # Extract character sheet
-            character_match = re.search(
-                r"CHARACTER_SHEET:\s*({.*?})", response, re.DOTALL
-            )
+            character_match = CHARACTER_SHEET_RE.search(response)
             character_sheet = (
                 json.loads(character_match.group(1)) if character_match else {}
             )
 
             # Extract prop sheet
-            prop_match = re.search(r"PROP_SHEET:\s*({.*?})", response, re.DOTALL)
+            prop_match = PROP_SHEET_RE.search(response)
             prop_sheet = json.loads(prop_match.group(1)) if prop_match else {}
 
             # Extract style guide
-            style_match = re.search(r"STYLE_GUIDE:\s*({.*?})", response, re.DOTALL)
+            style_match = STYLE_GUIDE_RE.search(response)
             style_guide = json.loads(style_match.group(1)) if style_match else {}
 
             # Extract each panel
@@ -1,3 +1,4 @@
+import functools
 import re
 import json
 from typing import Dict, List, Any, Optional, AsyncGenerator
@@ -5,6 +6,38 @@ from loguru import logger
 from models.schemas import StoryInputs
 from services.dialogue_extractor import dialogue_extractor
 
+# Global section patterns, compiled once; the streaming parser re-runs them
+# against the accumulated text on every chunk until each section is found.
+CHARACTER_SHEET_RE = re.compile(r"CHARACTER_SHEET:\s*({.*?})", re.DOTALL)
+PROP_SHEET_RE = re.compile(r"PROP_SHEET:\s*({.*?})", re.DOTALL)
+STYLE_GUIDE_RE = re.compile(r"STYLE_GUIDE:\s*({.*?})", re.DOTALL)
+
+
+@functools.lru_cache(maxsize=16)
+def _panel_dialogue_patterns(panel_number: int) -> tuple:
+    """Compiled dialogue text patterns for one panel, tried in order."""
+    patterns = (
+        rf'PANEL_{panel_number}:\s*dialogue_text:\s*"([^"]*)"',  # With quotes
+        rf"PANEL_{panel_number}:\s*dialogue_text:\s*([^\n]+)",  # Without quotes, until newline
+        rf'PANEL_{panel_number}:[^:]*dialogue_text[:\s]*"([^"]*)"',  # Flexible format with quotes
+        rf"PANEL_{panel_number}:[^:]*dialogue_text[:\s]*([^\n]+)",  # Flexible format without quotes
+        rf"Panel\s*{panel_number}:\s*'([^']*)'",  # Panel X: 'content' format (single quotes)
+        rf'Panel\s*{panel_number}:\s*"([^"]*)"',  # Panel X: "content" format (double quotes)
+        rf"Panel\s*{panel_number}:\s*([^'\"]+(?:'[^']*'[^'\"]*)*)",  # Panel X: mixed content with quotes
+    )
+    return tuple(re.compile(p, re.DOTALL | re.IGNORECASE) for p in patterns)
+
+
+# Fallback panel narration; only the requested panel is formatted.
+FALLBACK_DIALOGUE_TEMPLATES = (
+    "Meet {name}. They're feeling {mood} today, but deep inside burns a desire to {dream}. Every great journey begins with a single step forward.",
+    "{name} faces the challenge ahead. The path to {dream} isn't easy, but they've come too far to give up now. Sometimes the hardest battles are the ones we fight within ourselves.",
+    "Taking a moment to breathe, {name} reflects on how far they've already come. Even when feeling {mood}, there's strength in acknowledging both struggles and progress.",
+    "In this moment of clarity, {name} discovers something important. Their {dream} isn't just about the destination - it's about becoming the person they're meant to be along the way.",
+    "With newfound determination, {name} takes action. They realize that being {mood} doesn't define them - it's just one part of their story, and they have the power to write the next chapter.",
+    "Looking back on the journey, {name} sees how much they've grown. The road to {dream} continues, but now they know they have the strength to face whatever comes next. Hope lights the way forward.",
+)
+
 
 class StreamingPanelParser:
     """
@@ -40,7 +73,7 @@ class StreamingPanelParser:
 
         # Extract CHARACTER_SHEET
         if self.character_sheet is None:
-            character_match = re.search(r"CHARACTER_SHEET:\s*({.*?})", text, re.DOTALL)
+            character_match = CHARACTER_SHEET_RE.search(text)
             if character_match:
                 try:
                     self.character_sheet = json.loads(character_match.group(1))
@@ -51,7 +84,7 @@ class StreamingPanelParser:
 
         # Extract PROP_SHEET
         if self.prop_sheet is None:
-            prop_match = re.search(r"PROP_SHEET:\s*({.*?})", text, re.DOTALL)
+            prop_match = PROP_SHEET_RE.search(text)
             if prop_match:
                 try:
                     self.prop_sheet = json.loads(prop_match.group(1))
@@ -62,7 +95,7 @@ class StreamingPanelParser:
 
         # Extract STYLE_GUIDE
         if self.style_guide is None:
-            style_match = re.search(r"STYLE_GUIDE:\s*({.*?})", text, re.DOTALL)
+            style_match = STYLE_GUIDE_RE.search(text)
             if style_match:
                 try:
                     self.style_guide = json.loads(style_match.group(1))
@@ -78,26 +111,16 @@ class StreamingPanelParser:
     ) -> Optional[Dict[str, Any]]:
         """Extract panel-specific data for a given panel number."""
         # Try multiple dialogue text patterns for robustness
-        dialogue_patterns = [
-            rf'PANEL_{panel_number}:\s*dialogue_text:\s*"([^"]*)"',  # With quotes
-            rf"PANEL_{panel_number}:\s*dialogue_text:\s*([^\n]+)",  # Without quotes, until newline
-            rf'PANEL_{panel_number}:[^:]*dialogue_text[:\s]*"([^"]*)"',  # Flexible format with quotes
-            rf"PANEL_{panel_number}:[^:]*dialogue_text[:\s]*([^\n]+)",  # Flexible format without quotes
-            rf"Panel\s*{panel_number}:\s*'([^']*)'",  # Panel X: 'content' format (single quotes)
-            rf'Panel\s*{panel_number}:\s*"([^"]*)"',  # Panel X: "content" format (double quotes)
-            rf"Panel\s*{panel_number}:\s*([^'\"]+(?:'[^']*'[^'\"]*)*)",  # Panel X: mixed content with quotes
-        ]
-
         dialogue_text = None
-        for pattern in dialogue_patterns:
-            dialogue_match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
+        for pattern in _panel_dialogue_patterns(panel_number):
+            dialogue_match = pattern.search(text)
             if dialogue_match:
                 dialogue_text = dialogue_match.group(1).strip()
                 if (
                     dialogue_text and len(dialogue_text) > 10
                 ):  # Ensure meaningful content
                     logger.info(
-                        f"Panel {panel_number} dialogue extracted with pattern: {pattern[:50]}..."
+                        f"Panel {panel_number} dialogue extracted with pattern: {pattern.pattern[:50]}..."
                     )
                     break
 
@@ -505,16 +528,8 @@ class StreamingStoryGenerator:
         dream = inputs.dream if inputs else "their goals"
         mood = inputs.mood if inputs else "uncertain"
 
-        dialogue_map = {
-            1: f"Meet {name}. They're feeling {mood} today, but deep inside burns a desire to {dream}. Every great journey begins with a single step forward.",
-            2: f"{name} faces the challenge ahead. The path to {dream} isn't easy, but they've come too far to give up now. Sometimes the hardest battles are the ones we fight within ourselves.",
-            3: f"Taking a moment to breathe, {name} reflects on how far they've already come. Even when feeling {mood}, there's strength in acknowledging both struggles and progress.",
-            4: f"In this moment of clarity, {name} discovers something important. Their {dream} isn't just about the destination - it's about becoming the person they're meant to be along the way.",
-            5: f"With newfound determination, {name} takes action. They realize that being {mood} doesn't define them - it's just one part of their story, and they have the power to write the next chapter.",
-            6: f"Looking back on the journey, {name} sees how much they've grown. The road to {dream} continues, but now they know they have the strength to face whatever comes next. Hope lights the way forward.",
-        }
-
-        return dialogue_map.get(
-            panel_number,
-            f"{name} continues their journey toward {dream}, growing stronger with each step.",
-        )
+        if 1 <= panel_number <= len(FALLBACK_DIALOGUE_TEMPLATES):
+            template = FALLBACK_DIALOGUE_TEMPLATES[panel_number - 1]
+        else:
+            template = "{name} continues their journey toward {dream}, growing stronger with each step."
+        return template.format(name=name, dream=dream, mood=mood)
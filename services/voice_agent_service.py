@@ -5,22 +5,53 @@ Handles client-side audio via WebSocket streaming with correct protocol
 
 import os
 import asyncio
-import base64
-import json
-from typing import Dict, Any
+import functools
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import orjson
 from loguru import logger
 from fastapi import WebSocket, WebSocketDisconnect
 
 from google import genai
 from google.genai import types
 
-from datetime import datetime
+from config.settings import settings
+
+from datetime import datetime, timezone
 
 # Audio configuration constants
 SEND_SAMPLE_RATE = 16000
 RECEIVE_SAMPLE_RATE = 24000
 CHANNELS = 1
+TIMESTAMP_RESOLUTION_S = 0.001  # Reuse the ISO timestamp within 1ms bursts
 CHUNK_DURATION_MS = 100  # Send audio in 100ms chunks
+CHUNK_SIZE = SEND_SAMPLE_RATE * CHUNK_DURATION_MS // 1000 * 2  # int16 PCM bytes
+PCM_MIME = f"audio/pcm;rate={SEND_SAMPLE_RATE}"
+
+# Mic chunks held as pre-roll while local VAD waits for speech
+VAD_PREROLL_CHUNKS = settings.voice_vad_preroll_ms // CHUNK_DURATION_MS
+
+# Binary frame tag for model audio sent to the client (tag byte + raw PCM)
+AUDIO_FRAME_TAG = b"\x01"
+
+# Coalesce model audio into one outbound frame per ~20ms of playback; a frame is
+# sent once full, or AUDIO_FLUSH_MS after its first byte was buffered
+AUDIO_FLUSH_MS = 20
+AUDIO_FLUSH_BYTES = RECEIVE_SAMPLE_RATE * 2 * AUDIO_FLUSH_MS // 1000  # int16 PCM
+# A backed-up sender merges queued audio into writes of up to ~40ms
+AUDIO_WRITE_BATCH_MS = 40
+AUDIO_WRITE_BATCH_BYTES = RECEIVE_SAMPLE_RATE * 2 * AUDIO_WRITE_BATCH_MS // 1000
+
+# Outbound queue depth: how much playback a slow client may lag behind the model
+OUTBOUND_TARGET_LATENCY_S = 1.0
+OUTBOUND_QUEUE_SIZE = int(
+    RECEIVE_SAMPLE_RATE * 2 * OUTBOUND_TARGET_LATENCY_S / AUDIO_FLUSH_BYTES
+)
+# On overflow drop the oldest queued audio (keeps playback live); False drops the newest
+OUTBOUND_DROP_OLDEST = True
 
 # Compatibility for modality enums across SDK versions
 try:
@@ -31,9 +62,21 @@ except Exception:
     MOD_AUDIO = "AUDIO"
 
 
+# Persona prompt sent at Live setup (and shown by /voice/persona/config)
+PERSONA_SYSTEM_INSTRUCTION = (
+    "You are a compassionate mindfulness coach and mental wellness assistant. "
+    "IMPORTANT: You MUST speak ONLY in English. Do not use any other language under any circumstances. "
+    "Provide calming guidance, emotional support, and helpful meditation techniques. "
+    "Speak in a gentle, warm, and understanding tone. "
+    "Offer breathing exercises, meditation guidance, and positive affirmations when appropriate. "
+    "Keep responses conversational and natural."
+)
+
+
 # Initialize Gemini client with proper configuration
+@functools.lru_cache(maxsize=1)
 def get_gemini_client():
-    """Get properly configured Gemini client."""
+    """Get the process-wide Gemini client, configured on first use."""
     api_key = os.environ.get("GEMINI_API_KEY")
     if not api_key:
         raise ValueError("GEMINI_API_KEY environment variable is not set")
@@ -47,28 +90,32 @@ def get_gemini_client():
     return genai.Client(api_key=api_key, http_options={"api_version": "v1beta"})
 
 
+def realtime_input_config() -> Optional[types.RealtimeInputConfig]:
+    """Turn off Gemini's activity detection only when local VAD is opted into."""
+    if not settings.voice_local_vad:
+        return None
+    # Turns are then delimited by local VAD (activity_start/activity_end)
+    return types.RealtimeInputConfig(
+        automatic_activity_detection=types.AutomaticActivityDetection(disabled=True)
+    )
+
+
 def build_persona_live_config() -> types.LiveConnectConfig:
     """Primary AUDIO config with system_instruction so persona is applied at setup."""
     return types.LiveConnectConfig(
         response_modalities=[MOD_AUDIO],
         speech_config=types.SpeechConfig(language_code="en-US"),
+        session_resumption=types.SessionResumptionConfig(),
+        context_window_compression=types.ContextWindowCompressionConfig(
+            sliding_window=types.SlidingWindow()
+        ),
+        realtime_input_config=realtime_input_config(),
         generation_config=types.GenerationConfig(
             temperature=0.6,
             top_p=0.9,
         ),
         system_instruction=types.Content(
-            parts=[
-                types.Part.from_text(
-                    text=(
-                        "You are a compassionate mindfulness coach and mental wellness assistant. "
-                        "IMPORTANT: You MUST speak ONLY in English. Do not use any other language under any circumstances. "
-                        "Provide calming guidance, emotional support, and helpful meditation techniques. "
-                        "Speak in a gentle, warm, and understanding tone. "
-                        "Offer breathing exercises, meditation guidance, and positive affirmations when appropriate. "
-                        "Keep responses conversational and natural."
-                    )
-                )
-            ],
+            parts=[types.Part.from_text(text=PERSONA_SYSTEM_INSTRUCTION)],
         ),
     )
 
@@ -78,23 +125,123 @@ def build_audio_fallback_config() -> types.LiveConnectConfig:
     return types.LiveConnectConfig(
         response_modalities=[MOD_AUDIO],
         speech_config=types.SpeechConfig(language_code="en-US"),
+        session_resumption=types.SessionResumptionConfig(),
+        context_window_compression=types.ContextWindowCompressionConfig(
+            sliding_window=types.SlidingWindow()
+        ),
+        realtime_input_config=realtime_input_config(),
     )
 
 
+@functools.lru_cache(maxsize=1)
+def live_configs_to_try() -> Tuple[Tuple[str, Optional[types.LiveConnectConfig]], ...]:
+    """Connect configs in fallback order, built once and shared by all sessions."""
+    # IMPORTANT: persona config first so system_instruction is applied at setup
+    return (
+        ("persona-audio", build_persona_live_config()),
+        ("audio-only-fallback", build_audio_fallback_config()),
+        ("text-only", types.LiveConnectConfig(response_modalities=[MOD_TEXT])),
+        ("bare", None),
+    )
+
+
+def configs_with_resumption_handle(
+    configs: Iterable[Tuple[str, Optional[types.LiveConnectConfig]]], handle: str
+) -> Tuple[Tuple[str, Optional[types.LiveConnectConfig]], ...]:
+    """Copies of the resumable configs that resume the Live session behind `handle`."""
+    resumption = types.SessionResumptionConfig(handle=handle)
+    return tuple(
+        (name, config.model_copy(update={"session_resumption": resumption}))
+        for name, config in configs
+        if config is not None and config.session_resumption is not None
+    )
+
+
+class _OutboundQueue(asyncio.Queue):
+    """Bounded queue of outbound frames: bytes are raw PCM audio, str are JSON text."""
+
+    def take_audio_run(self, first: bytes, max_bytes: int) -> bytes:
+        """Join `first` with the audio frames queued directly behind it, up to max_bytes."""
+        queue = self._queue
+        if not queue or not isinstance(queue[0], bytes):
+            return first
+        parts = [first]
+        size = len(first)
+        while (
+            queue and isinstance(queue[0], bytes) and size + len(queue[0]) <= max_bytes
+        ):
+            frame = self.get_nowait()
+            self.task_done()
+            parts.append(frame)
+            size += len(frame)
+        return b"".join(parts)
+
+    def drop_oldest_audio(self) -> bool:
+        """Evict the oldest queued audio frame; False if only text is queued."""
+        for index, frame in enumerate(self._queue):
+            if isinstance(frame, bytes):
+                del self._queue[index]
+                self.task_done()
+                return True
+        return False
+
+
+@dataclass(slots=True)
+class VoiceSession:
+    """State for one client WebSocket bridged to a Gemini Live session."""
+
+    loop: asyncio.AbstractEventLoop
+    live_session: Any
+    live_session_context: Any
+    websocket: WebSocket
+    out_q: _OutboundQueue
+    audio_blob: types.Blob  # Reused for every mic chunk sent to Gemini
+    config_used: str
+    allow_audio: bool
+    manual_vad: bool
+    response_handler: Callable
+    tpl_setup_complete: str
+    tpl_turn_complete: str
+    tpl_message_sent: str
+    last_send_time: float
+    stop_event: asyncio.Event = field(default_factory=asyncio.Event)
+    run_task: Optional[asyncio.Task] = None  # _run_session; owns teardown
+    live_ready: bool = True
+    audio_buffer: deque = field(default_factory=deque)  # memoryviews of mic audio
+    audio_buffer_len: int = 0
+    audio_mime_type: Optional[str] = None
+    out_audio_buf: bytearray = field(default_factory=bytearray)
+    audio_flush_handle: Optional[asyncio.TimerHandle] = None
+    resumption_handle: Optional[str] = None  # Latest handle sent to the client
+    vad_active: bool = False
+    vad_silence_ms: int = 0
+    vad_preroll: deque = field(default_factory=lambda: deque(maxlen=VAD_PREROLL_CHUNKS))
+
+    @property
+    def is_running(self) -> bool:
+        return not self.stop_event.is_set()
+
+
 class WebSocketVoiceAgent:
     """Voice Agent using WebSocket streaming with proper Gemini Live API protocol."""
 
     def __init__(self):
-        self.active_sessions: Dict[str, Dict[str, Any]] = {}
+        self.active_sessions: Dict[str, VoiceSession] = {}
         self.client = None
+        self._ts_cache = ("", float("-inf"))
 
     def _ensure_client(self):
-        """Ensure Gemini client is initialized."""
+        """Ensure Gemini client is initialized (shared by all agent instances)."""
         if not self.client:
             self.client = get_gemini_client()
 
-    async def create_session(self, session_id: str, websocket: WebSocket):
-        """Create a new voice session with WebSocket connection."""
+    async def create_session(
+        self,
+        session_id: str,
+        websocket: WebSocket,
+        resumption_handle: Optional[str] = None,
+    ):
+        """Create a voice session, resuming via a handle this client was sent."""
         try:
             logger.info(f"🎤 Creating voice session: {session_id}")
             self._ensure_client()
@@ -111,160 +258,155 @@ class WebSocketVoiceAgent:
             seen = set()
             models_to_try = [m for m in models_to_try if not (m in seen or seen.add(m))]
 
-            # IMPORTANT: persona config first so system_instruction is applied at setup
-            configs_to_try = [
-                ("persona-audio", build_persona_live_config()),
-                ("audio-only-fallback", build_audio_fallback_config()),
-                ("text-only", types.LiveConnectConfig(response_modalities=[MOD_TEXT])),
-                ("bare", None),
-            ]
-
-            live_session = None
-            successful_config = None
-
-            for model_name in models_to_try:
-                for config_name, config in configs_to_try:
-                    try:
-                        logger.info(
-                            f"Trying model '{model_name}' with {config_name} configuration..."
-                        )
-                        if config is None:
-                            live_session_context = self.client.aio.live.connect(
-                                model=model_name
-                            )
-                        else:
-                            live_session_context = self.client.aio.live.connect(
-                                model=model_name, config=config
-                            )
-
-                        live_session = await live_session_context.__aenter__()
-                        logger.info(
-                            f"✅ Connected to {model_name} with {config_name} configuration!"
-                        )
-                        successful_config = config_name
-                        preferred_model = model_name
-                        raise StopIteration  # break out of both loops
-                    except StopIteration:
-                        break
-                    except Exception as e:
-                        logger.warning(
-                            f"{config_name} config failed on {model_name}: {e}"
-                        )
-                        # Best-effort close on failure
-                        if "live_session_context" in locals():
-                            try:
-                                await live_session_context.__aexit__(None, None, None)
-                            except Exception:
-                                pass
-                        continue
-                else:
-                    continue
-                break
+            configs = live_configs_to_try()
+            if resumption_handle:
+                logger.info(f"♻️ Resuming Live session for {session_id}")
+                # Fresh configs stay as fallbacks in case the handle has expired
+                configs = (
+                    configs_with_resumption_handle(configs, resumption_handle) + configs
+                )
 
-            if not live_session:
+            connection = await self._try_connect(models_to_try, configs)
+            if not connection:
                 raise Exception("All configuration attempts failed")
 
+            live_session, live_session_context, preferred_model, successful_config = (
+                connection
+            )
+
             # Store session; arm immediately so client can stream mic
-            self.active_sessions[session_id] = {
-                "live_session": live_session,
-                "live_session_context": live_session_context,
-                "websocket": websocket,
-                "is_running": True,
-                "live_ready": True,
-                "audio_buffer": bytearray(),
-                "last_send_time": asyncio.get_event_loop().time(),
-                "allow_audio": successful_config
+            loop = asyncio.get_running_loop()
+            self.active_sessions[session_id] = VoiceSession(
+                loop=loop,
+                live_session=live_session,
+                live_session_context=live_session_context,
+                websocket=websocket,
+                out_q=_OutboundQueue(maxsize=OUTBOUND_QUEUE_SIZE),
+                audio_blob=types.Blob(data=b"", mime_type=PCM_MIME),
+                config_used=successful_config,
+                allow_audio=successful_config
                 in ["persona-audio", "audio-only-fallback", "bare"],
-                "config_used": successful_config,
-            }
+                manual_vad=settings.voice_local_vad
+                and successful_config in ["persona-audio", "audio-only-fallback"],
+                response_handler=self._select_response_handler(successful_config),
+                tpl_setup_complete=self._control_template("setup_complete", session_id),
+                tpl_turn_complete=self._control_template("turn_complete", session_id),
+                tpl_message_sent=self._control_template("message_sent", session_id),
+                last_send_time=loop.time(),
+            )
+            session_data = self.active_sessions[session_id]
 
             # Notify client
-            await websocket.send_text(
-                json.dumps(
-                    {
-                        "type": "session_status",
-                        "session_id": session_id,
-                        "status": "connected",
-                        "message": f"Voice session ready ({successful_config} config)",
-                        "model": preferred_model,
-                        "audio_enabled": True,
-                        "timestamp": self._get_timestamp(),
-                    }
-                )
-            )
-            await websocket.send_text(
-                json.dumps(
-                    {
-                        "type": "setup_complete",
-                        "session_id": session_id,
-                        "timestamp": self._get_timestamp(),
-                    }
-                )
+            await self._send_json(
+                websocket,
+                {
+                    "type": "session_status",
+                    "session_id": session_id,
+                    "status": "connected",
+                    "message": f"Voice session ready ({successful_config} config)",
+                    "model": preferred_model,
+                    "audio_enabled": True,
+                    "timestamp": self._get_timestamp(),
+                },
             )
+            await self._send_control(websocket, session_data.tpl_setup_complete)
 
-            # Run session loops
-            await self._run_session(session_id)
+            # Run session loops; stop_session waits on this task for teardown
+            session_data.run_task = asyncio.create_task(self._run_session(session_id))
+            await session_data.run_task
             return True
         except Exception as e:
             logger.error(f"❌ Failed to create session {session_id}: {e}")
             try:
-                await websocket.send_text(
-                    json.dumps(
-                        {
-                            "type": "error",
-                            "message": f"Failed to create session: {str(e)}",
-                            "timestamp": self._get_timestamp(),
-                        }
-                    )
+                await self._send_json(
+                    websocket,
+                    {
+                        "type": "error",
+                        "message": f"Failed to create session: {str(e)}",
+                        "timestamp": self._get_timestamp(),
+                    },
                 )
             except:
                 pass
             return False
 
+    async def _try_connect(
+        self,
+        models: List[str],
+        configs: Iterable[Tuple[str, Optional[types.LiveConnectConfig]]],
+    ) -> Optional[Tuple[Any, Any, str, str]]:
+        """Return (session, context, model, config_name) for the first working combo."""
+        for model_name in models:
+            for config_name, config in configs:
+                logger.info(
+                    f"Trying model '{model_name}' with {config_name} configuration..."
+                )
+                live_session_context = None
+                try:
+                    if config is None:
+                        live_session_context = self.client.aio.live.connect(
+                            model=model_name
+                        )
+                    else:
+                        live_session_context = self.client.aio.live.connect(
+                            model=model_name, config=config
+                        )
+                    live_session = await live_session_context.__aenter__()
+                except Exception as e:
+                    logger.warning(f"{config_name} config failed on {model_name}: {e}")
+                    # Best-effort close on failure
+                    if live_session_context is not None:
+                        try:
+                            await live_session_context.__aexit__(None, None, None)
+                        except Exception:
+                            pass
+                    continue
+
+                logger.info(
+                    f"✅ Connected to {model_name} with {config_name} configuration!"
+                )
+                return live_session, live_session_context, model_name, config_name
+
+        return None
+
     async def _run_session(self, session_id: str):
         """Run main session with proper cancellation on disconnect."""
         session_data = self.active_sessions.get(session_id)
         if not session_data:
             return
 
-        receive_task = response_task = None
         try:
-            receive_task = asyncio.create_task(self._handle_client_messages(session_id))
-            response_task = asyncio.create_task(
-                self._handle_model_responses(session_id)
-            )
+            async with asyncio.TaskGroup() as tg:
+                tasks = (
+                    tg.create_task(self._handle_client_messages(session_id)),
+                    tg.create_task(self._handle_model_responses(session_id)),
+                    tg.create_task(self._handle_outbound(session_id)),
+                    tg.create_task(session_data.stop_event.wait()),
+                )
 
-            done, pending = await asyncio.wait(
-                {receive_task, response_task}, return_when=asyncio.FIRST_EXCEPTION
-            )
+                # Any loop finishing (or stop_session) ends the session
+                def _cancel_siblings(_):
+                    for task in tasks:
+                        task.cancel()
 
-            for t in done:
-                exc = t.exception()
-                if exc:
-                    raise exc
-        except Exception as e:
-            logger.error(f"Session error for {session_id}: {e}")
+                for task in tasks:
+                    task.add_done_callback(_cancel_siblings)
+        except* Exception as eg:
+            for e in eg.exceptions:
+                logger.error(f"Session error for {session_id}: {e}")
         finally:
-            for t in (receive_task, response_task):
-                if t and not t.done():
-                    t.cancel()
-                    try:
-                        await t
-                    except asyncio.CancelledError:
-                        pass
-
-            sd = self.active_sessions.get(session_id)
-            if sd:
-                sd["is_running"] = False
+            # All session loops have exited; don't let a pending flush outlive them
+            if session_data.audio_flush_handle is not None:
+                session_data.audio_flush_handle.cancel()
+            session_data.stop_event.set()
 
+            # Sole owner of teardown: stop_session only signals and waits
             try:
-                if sd and "live_session_context" in sd:
-                    await sd["live_session_context"].__aexit__(None, None, None)
+                await session_data.live_session_context.__aexit__(None, None, None)
             except Exception as e:
                 logger.warning(f"Error closing live session context: {e}")
 
-            if session_id in self.active_sessions:
-                del self.active_sessions[session_id]
+            self.active_sessions.pop(session_id, None)
 
     async def _handle_client_messages(self, session_id: str):
         """Handle incoming messages from the client; break on disconnect."""
@@ -272,84 +414,28 @@ class WebSocketVoiceAgent:
         if not session_data:
             return
 
-        websocket = session_data["websocket"]
-        live_session = session_data["live_session"]
+        websocket = session_data.websocket
 
         try:
-            while session_data.get("is_running", False):
+            while session_data.is_running:
                 try:
-                    message = await asyncio.wait_for(websocket.receive(), timeout=1.0)
-
-                    if "text" in message:
-                        data = json.loads(message["text"])
-                        if data.get("type") == "text_message":
-                            text = data.get("message", "")
-                            logger.info(f"📝 Sending text: {text}")
-                            await live_session.send_client_content(
-                                turns=[
-                                    types.Content(
-                                        role="user",
-                                        parts=[types.Part.from_text(text=text)],
-                                    )
-                                ],
-                                turn_complete=True,
-                            )
-                            await websocket.send_text(
-                                json.dumps(
-                                    {
-                                        "type": "message_sent",
-                                        "session_id": session_id,
-                                        "timestamp": self._get_timestamp(),
-                                    }
-                                )
-                            )
+                    # No timeout: _run_session cancels this task on shutdown
+                    message = await websocket.receive()
 
-                        elif data.get("type") == "end_turn":
-                            logger.info("🔚 Ending turn")
-                            # No explicit action; text path sets turn_complete
-
-                    elif "bytes" in message:
-                        if not session_data.get("allow_audio", True):
-                            await websocket.send_text(
-                                json.dumps(
-                                    {
-                                        "type": "error",
-                                        "message": "Audio input disabled for this session configuration.",
-                                        "timestamp": self._get_timestamp(),
-                                    }
-                                )
-                            )
-                            continue
-
-                        if not session_data.get("live_ready", False):
-                            session_data["audio_buffer"] = bytearray()
-                            continue
+                    # Audio dominates the stream, so route bytes frames first
+                    audio_bytes = message.get("bytes")
+                    if audio_bytes is not None:
+                        await self._handle_audio_in(session_data, audio_bytes)
+                        continue
 
-                        audio_bytes = message["bytes"]
-                        session_data["audio_buffer"].extend(audio_bytes)
+                    if message["type"] == "websocket.disconnect":
+                        logger.info(f"Client disconnected: {session_id}")
+                        break
 
-                        samples_per_chunk = int(
-                            SEND_SAMPLE_RATE * CHUNK_DURATION_MS / 1000
-                        )
-                        bytes_per_sample = 2  # int16 PCM
-                        chunk_size = samples_per_chunk * bytes_per_sample
-
-                        while len(session_data["audio_buffer"]) >= chunk_size:
-                            chunk = bytes(session_data["audio_buffer"][:chunk_size])
-                            del session_data["audio_buffer"][:chunk_size]
-
-                            try:
-                                await live_session.send_realtime_input(
-                                    audio=types.Blob(
-                                        data=chunk,
-                                        mime_type=f"audio/pcm;rate={SEND_SAMPLE_RATE}",
-                                    )
-                                )
-                            except Exception as audio_error:
-                                logger.warning(f"Audio send error: {audio_error}")
+                    text_frame = message.get("text")
+                    if text_frame is not None:
+                        await self._handle_control_in(session_data, text_frame)
 
-                except asyncio.TimeoutError:
-                    continue
                 except WebSocketDisconnect:
                     logger.info(f"Client disconnected: {session_id}")
                     break
@@ -359,7 +445,130 @@ class WebSocketVoiceAgent:
         finally:
             sd = self.active_sessions.get(session_id)
             if sd:
-                sd["is_running"] = False
+                sd.stop_event.set()
+
+    async def _handle_audio_in(self, session_data: VoiceSession, audio_bytes: bytes):
+        """Buffer inbound mic audio and forward it to Gemini in fixed-size chunks."""
+        if not session_data.allow_audio:
+            await self._queue_json(
+                session_data,
+                {
+                    "type": "error",
+                    "message": "Audio input disabled for this session configuration.",
+                    "timestamp": self._get_timestamp(),
+                },
+            )
+            return
+
+        if not session_data.live_ready:
+            session_data.audio_buffer.clear()
+            session_data.audio_buffer_len = 0
+            return
+
+        session_data.audio_buffer.append(memoryview(audio_bytes))
+        session_data.audio_buffer_len += len(audio_bytes)
+
+        live_session = session_data.live_session
+        audio_blob = session_data.audio_blob
+        while session_data.audio_buffer_len >= CHUNK_SIZE:
+            chunk = self._pop_audio_chunk(session_data, CHUNK_SIZE)
+
+            try:
+                if session_data.manual_vad and not await self._vad_gate(
+                    session_data, chunk
+                ):
+                    continue
+                # Sends are awaited one at a time and serialized before the await
+                # returns, so the session's Blob can be refilled in place
+                audio_blob.data = chunk
+                await live_session.send_realtime_input(audio=audio_blob)
+            except Exception as audio_error:
+                logger.warning(f"Audio send error: {audio_error}")
+
+    async def _vad_gate(self, session_data: VoiceSession, chunk: bytes) -> bool:
+        """Signal activity start/end on RMS transitions; True if the chunk is speech.
+
+        While idle, recent chunks are kept as pre-roll and sent right after
+        activity_start so the onset of an utterance is not clipped.
+        """
+        samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+        rms = float(np.sqrt(np.mean(samples * samples))) / 32768
+        live_session = session_data.live_session
+
+        if not session_data.vad_active:
+            if rms <= settings.voice_vad_on_threshold:
+                session_data.vad_preroll.append(chunk)
+                return False
+            session_data.vad_active = True
+            session_data.vad_silence_ms = 0
+            await live_session.send_realtime_input(activity_start=types.ActivityStart())
+            audio_blob = session_data.audio_blob
+            while session_data.vad_preroll:
+                audio_blob.data = session_data.vad_preroll.popleft()
+                await live_session.send_realtime_input(audio=audio_blob)
+            return True
+
+        if rms >= settings.voice_vad_off_threshold:
+            session_data.vad_silence_ms = 0
+            return True
+
+        session_data.vad_silence_ms += CHUNK_DURATION_MS
+        if session_data.vad_silence_ms < settings.voice_vad_hangover_ms:
+            return True
+
+        session_data.vad_active = False
+        await live_session.send_realtime_input(activity_end=types.ActivityEnd())
+        return False
+
+    async def _handle_control_in(self, session_data: VoiceSession, text_frame: str):
+        """Handle a JSON control message from the client."""
+        data = orjson.loads(text_frame)
+        if data.get("type") == "text_message":
+            text = data.get("message", "")
+            logger.info(f"📝 Sending text: {text}")
+            await session_data.live_session.send_client_content(
+                turns=[
+                    types.Content(
+                        role="user",
+                        parts=[types.Part.from_text(text=text)],
+                    )
+                ],
+                turn_complete=True,
+            )
+            await self._queue_control(session_data, session_data.tpl_message_sent)
+
+        elif data.get("type") == "end_turn":
+            logger.info("🔚 Ending turn")
+            # Close an open VAD segment now; text path sets turn_complete itself
+            if session_data.vad_active:
+                session_data.vad_active = False
+                await session_data.live_session.send_realtime_input(
+                    activity_end=types.ActivityEnd()
+                )
+
+    def _pop_audio_chunk(self, session_data: VoiceSession, chunk_size: int) -> bytes:
+        """Pop exactly chunk_size bytes off the front of the mic buffer."""
+        audio_buffer = session_data.audio_buffer
+        session_data.audio_buffer_len -= chunk_size
+
+        # Clients normally send whole chunks: hand the received bytes through as-is
+        head = audio_buffer[0]
+        if len(head) == chunk_size and len(head.obj) == chunk_size:
+            audio_buffer.popleft()
+            return bytes(head.obj)
+
+        parts = []
+        needed = chunk_size
+        while needed:
+            segment = audio_buffer.popleft()
+            if len(segment) > needed:
+                # Keep the remainder (a view, no copy) at the front for the next chunk
+                audio_buffer.appendleft(segment[needed:])
+                segment = segment[:needed]
+            parts.append(segment)
+            needed -= len(segment)
+        # Single copy from the websocket payloads into the outgoing chunk
+        return b"".join(parts)
 
     async def _handle_model_responses(self, session_id: str):
         """Handle responses from the model."""
@@ -367,14 +576,14 @@ class WebSocketVoiceAgent:
         if not session_data:
             return
 
-        live_session = session_data["live_session"]
-        websocket = session_data["websocket"]
+        live_session = session_data.live_session
+        handle_parts = session_data.response_handler
 
         try:
-            while session_data["is_running"]:
+            while session_data.is_running:
                 try:
                     async for response in live_session.receive():
-                        if not session_data["is_running"]:
+                        if not session_data.is_running:
                             break
 
                         # Single audio stream: use inline_data within server_content parts
@@ -385,63 +594,52 @@ class WebSocketVoiceAgent:
                             server_content = response.server_content
 
                             if getattr(server_content, "model_turn", None):
-                                for part in server_content.model_turn.parts:
-                                    if getattr(part, "text", None):
-                                        await websocket.send_text(
-                                            json.dumps(
-                                                {
-                                                    "type": "ai_response",
-                                                    "session_id": session_id,
-                                                    "text": part.text,
-                                                    "timestamp": self._get_timestamp(),
-                                                }
-                                            )
-                                        )
-
-                                    if getattr(part, "inline_data", None):
-                                        audio_b64 = base64.b64encode(
-                                            part.inline_data.data
-                                        ).decode("utf-8")
-                                        await websocket.send_text(
-                                            json.dumps(
-                                                {
-                                                    "type": "audio_response",
-                                                    "session_id": session_id,
-                                                    "audio_data": audio_b64,
-                                                    "mime_type": part.inline_data.mime_type,
-                                                    "timestamp": self._get_timestamp(),
-                                                }
-                                            )
-                                        )
+                                await handle_parts(
+                                    session_id,
+                                    session_data,
+                                    server_content.model_turn.parts,
+                                )
 
                             if getattr(server_content, "turn_complete", None):
-                                await websocket.send_text(
-                                    json.dumps(
-                                        {
-                                            "type": "turn_complete",
-                                            "session_id": session_id,
-                                            "timestamp": self._get_timestamp(),
-                                        }
-                                    )
+                                self._flush_audio(session_data)
+                                await self._queue_control(
+                                    session_data, session_data.tpl_turn_complete
                                 )
 
+                        update = getattr(response, "session_resumption_update", None)
+                        if (
+                            update
+                            and update.resumable
+                            and update.new_handle
+                            and update.new_handle != session_data.resumption_handle
+                        ):
+                            # Only the connected client holds the handle, so only it
+                            # can resume this conversation
+                            session_data.resumption_handle = update.new_handle
+                            await self._queue_json(
+                                session_data,
+                                {
+                                    "type": "session_resumption",
+                                    "session_id": session_id,
+                                    "handle": update.new_handle,
+                                    "timestamp": self._get_timestamp(),
+                                },
+                            )
+
                         # Idempotent setup_complete if surfaced by SDK
                         if getattr(response, "setup_complete", None) or getattr(
                             response, "setupComplete", None
                         ):
                             sd = self.active_sessions.get(session_id)
                             if sd:
-                                sd["live_ready"] = True
-                            await websocket.send_text(
-                                json.dumps(
-                                    {
-                                        "type": "setup_complete",
-                                        "session_id": session_id,
-                                        "timestamp": self._get_timestamp(),
-                                    }
-                                )
+                                sd.live_ready = True
+                            await self._queue_control(
+                                session_data, session_data.tpl_setup_complete
                             )
 
+                    # Don't hold back the tail of a stream that ended mid-buffer
+                    self._flush_audio(session_data)
+
                 except asyncio.TimeoutError:
                     await asyncio.sleep(0.1)
                     continue
@@ -451,26 +649,186 @@ class WebSocketVoiceAgent:
         except Exception as e:
             logger.error(f"Model response handler error: {e}")
 
+    async def _handle_audio_parts(
+        self, session_id: str, session_data: VoiceSession, parts
+    ):
+        """Audio-modality configs: the model only returns inline audio parts."""
+        for part in parts:
+            inline_data = part.inline_data
+            if inline_data:
+                await self._send_audio(session_id, session_data, inline_data)
+
+    async def _handle_text_parts(
+        self, session_id: str, session_data: VoiceSession, parts
+    ):
+        """Text-only config: the model only returns text parts."""
+        for part in parts:
+            text = part.text
+            if text:
+                await self._queue_json(
+                    session_data,
+                    {
+                        "type": "ai_response",
+                        "session_id": session_id,
+                        "text": text,
+                        "timestamp": self._get_timestamp(),
+                    },
+                )
+
+    async def _handle_mixed_parts(
+        self, session_id: str, session_data: VoiceSession, parts
+    ):
+        """Bare config: the modality is up to the model, so check both."""
+        for part in parts:
+            if getattr(part, "text", None):
+                await self._queue_json(
+                    session_data,
+                    {
+                        "type": "ai_response",
+                        "session_id": session_id,
+                        "text": part.text,
+                        "timestamp": self._get_timestamp(),
+                    },
+                )
+
+            if getattr(part, "inline_data", None):
+                await self._send_audio(session_id, session_data, part.inline_data)
+
+    def _select_response_handler(self, config_name: str):
+        """Pick the model_turn part handler specialized for the connected config."""
+        if config_name in ("persona-audio", "audio-only-fallback"):
+            return self._handle_audio_parts
+        if config_name == "text-only":
+            return self._handle_text_parts
+        return self._handle_mixed_parts
+
+    async def _send_audio(
+        self, session_id: str, session_data: VoiceSession, inline_data
+    ):
+        """Buffer model audio for a binary frame; announce mime type changes as JSON."""
+        mime_type = inline_data.mime_type
+        if mime_type != session_data.audio_mime_type:
+            self._flush_audio(session_data)
+            session_data.audio_mime_type = mime_type
+            await self._queue_json(
+                session_data,
+                {
+                    "type": "audio_meta",
+                    "session_id": session_id,
+                    "mime_type": mime_type,
+                    "timestamp": self._get_timestamp(),
+                },
+            )
+
+        out_audio_buf = session_data.out_audio_buf
+        out_audio_buf.extend(inline_data.data)
+        if len(out_audio_buf) >= AUDIO_FLUSH_BYTES:
+            self._flush_audio(session_data)
+        elif session_data.audio_flush_handle is None:
+            # Deadline set by the first buffered byte; later parts don't push it out
+            session_data.audio_flush_handle = session_data.loop.call_later(
+                AUDIO_FLUSH_MS / 1000, self._flush_audio, session_data
+            )
+
+    def _flush_audio(self, session_data: VoiceSession):
+        """Queue buffered model audio; the sender adds the frame tag on write."""
+        if session_data.audio_flush_handle is not None:
+            session_data.audio_flush_handle.cancel()
+            session_data.audio_flush_handle = None
+        out_audio_buf = session_data.out_audio_buf
+        if not out_audio_buf:
+            return
+        frame = bytes(out_audio_buf)
+        out_audio_buf.clear()
+        self._queue_audio(session_data, frame)
+
+    def _queue_audio(self, session_data: VoiceSession, frame: bytes):
+        """Queue an audio frame without waiting, evicting stale audio when full."""
+        out_q = session_data.out_q
+        if out_q.full() and not (OUTBOUND_DROP_OLDEST and out_q.drop_oldest_audio()):
+            # Nothing evictable (or drop-newest policy): skip this audio frame
+            return
+        out_q.put_nowait(frame)
+
+    async def _queue_frame(self, session_data: VoiceSession, frame: str):
+        """Queue a text frame for the sender task, evicting stale audio when full."""
+        out_q = session_data.out_q
+        if out_q.full() and not (OUTBOUND_DROP_OLDEST and out_q.drop_oldest_audio()):
+            await out_q.put(frame)
+            return
+        out_q.put_nowait(frame)
+
+    async def _queue_json(self, session_data: VoiceSession, payload: Dict[str, Any]):
+        """Serialize a control message with orjson and queue it as a text frame."""
+        await self._queue_frame(session_data, orjson.dumps(payload).decode("utf-8"))
+
+    async def _queue_control(self, session_data: VoiceSession, template: str):
+        """Queue a pre-serialized control message with a fresh timestamp."""
+        await self._queue_frame(session_data, template + self._get_timestamp() + '"}')
+
+    async def _handle_outbound(self, session_id: str):
+        """Drain the session's outbound queue so slow clients never stall Gemini reads."""
+        session_data = self.active_sessions.get(session_id)
+        if not session_data:
+            return
+
+        websocket = session_data.websocket
+        out_q = session_data.out_q
+        while True:
+            frame = await out_q.get()
+            if isinstance(frame, bytes):
+                # Audio already waiting behind this frame goes out in the same write
+                pcm = out_q.take_audio_run(frame, AUDIO_WRITE_BATCH_BYTES)
+                await websocket.send_bytes(AUDIO_FRAME_TAG + pcm)
+            else:
+                await websocket.send_text(frame)
+            out_q.task_done()
+
     async def stop_session(self, session_id: str):
-        """Stop a voice session."""
-        if session_id not in self.active_sessions:
+        """Stop a voice session and wait for _run_session to tear it down."""
+        session_data = self.active_sessions.get(session_id)
+        if not session_data:
             return
 
-        session_data = self.active_sessions[session_id]
-        session_data["is_running"] = False
+        # Wakes _run_session immediately, which cancels the session loops
+        session_data.stop_event.set()
+        # Keep no handle past a stop; only the client that was sent one can resume
+        session_data.resumption_handle = None
 
-        try:
-            if "live_session_context" in session_data:
-                await session_data["live_session_context"].__aexit__(None, None, None)
-        except Exception as e:
-            logger.warning(f"Error closing live session: {e}")
+        run_task = session_data.run_task
+        if run_task is None:
+            # Loops not started yet: _run_session sees the event and tears down
+            return
+        if run_task is not asyncio.current_task():
+            # wait() neither raises the task's outcome nor cancels it with us
+            await asyncio.wait((run_task,))
 
-        del self.active_sessions[session_id]
+        self.active_sessions.pop(session_id, None)
         logger.success(f"Session stopped: {session_id}")
 
+    async def _send_json(self, websocket: WebSocket, payload: Dict[str, Any]):
+        """Serialize a control message with orjson and send it as a text frame."""
+        await websocket.send_text(orjson.dumps(payload).decode("utf-8"))
+
+    @staticmethod
+    def _control_template(message_type: str, session_id: str) -> str:
+        """Pre-serialize a control message up to its timestamp value."""
+        prefix = orjson.dumps({"type": message_type, "session_id": session_id})
+        return prefix[:-1].decode("utf-8") + ',"timestamp":"'
+
+    async def _send_control(self, websocket: WebSocket, template: str):
+        """Send a pre-serialized control message with a fresh timestamp."""
+        await websocket.send_text(template + self._get_timestamp() + '"}')
+
     def _get_timestamp(self):
-        """Get current timestamp."""
-        return datetime.now().isoformat()
+        """Get current timestamp, cached for bursts of sends within 1ms."""
+        now = time.monotonic()
+        cached, cached_at = self._ts_cache
+        if now - cached_at < TIMESTAMP_RESOLUTION_S:
+            return cached
+        timestamp = datetime.now(timezone.utc).isoformat()
+        self._ts_cache = (timestamp, now)
+        return timestamp
 
 
 # Enhanced WebSocket Voice Agent with model selection
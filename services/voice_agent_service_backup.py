@@ -5,14 +5,17 @@ Handles client-side audio via WebSocket streaming
 
 import os
 import asyncio
-import base64
-import numpy as np
-from typing import Optional, Callable, Dict, Any
+import struct
+import time
+from datetime import datetime, timezone
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
 from loguru import logger
 from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.websockets import WebSocketState
 from google import genai
 from google.genai import types
-import json
+import orjson
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -22,6 +25,54 @@ load_dotenv()
 SEND_SAMPLE_RATE = 16000
 RECEIVE_SAMPLE_RATE = 24000
 CHANNELS = 1
+PCM_MIME = f"audio/pcm;rate={SEND_SAMPLE_RATE}"
+TIMESTAMP_RESOLUTION_S = 0.001  # Reuse the ISO timestamp within 1ms bursts
+
+# Response loop retry tuning: exponential backoff capped at the max delay
+RESPONSE_RETRY_BASE_DELAY = 0.1
+RESPONSE_RETRY_MAX_DELAY = 2.0
+
+# Mic audio is forwarded to Gemini in batches of ~100ms, or after 50ms at most
+TX_FLUSH_BYTES = SEND_SAMPLE_RATE * 2 * 100 // 1000  # int16 PCM
+TX_FLUSH_DELAY_S = 0.05
+
+# Circuit breaker for sends to Gemini: after a failure, skip sends for a window
+# that doubles on each failed probe, up to the max
+SEND_BREAKER_BASE_WINDOW_S = 0.5
+SEND_BREAKER_MAX_WINDOW_S = 5.0
+
+# Upper bound on how long stop_session waits for cancelled tasks
+STOP_SESSION_TIMEOUT = 0.5
+
+# Model audio goes out as binary frames of one or more messages, each a 12-byte
+# header (magic, type, flags, seq, payload_len) followed by raw PCM. JSON text
+# frames carry control and text messages only
+FRAME_MAGIC = 0x5641  # "VA"
+FRAME_TYPE_AUDIO = 0x01
+FRAME_HEADER = struct.Struct("!HBBII")
+
+# Text deltas arriving within this window are sent as one ai_response
+TEXT_FLUSH_DELAY_S = 0.02
+
+# Outbound frames a slow client may fall behind by before old audio is shed
+OUTBOUND_QUEUE_SIZE = 256
+
+# Outbound batching: frames already queued go out together, capped so one write
+# stays within a single TLS record; text batches use a "batch" envelope
+OUTBOUND_BATCH_MAX_MESSAGES = 32
+OUTBOUND_BATCH_MAX_BYTES = 16 * 1024
+
+# Error fragments meaning the Gemini Live channel is gone for good
+TERMINAL_ERROR_MARKERS = (
+    "failedprecondition",
+    "failed_precondition",
+    "connectionclosed",
+    "session closed",
+    "session is closed",
+    "sent 1000",
+    "received 1000",
+    "1011",
+)
 
 # Ensure Google AI Studio usage
 os.environ.pop("GOOGLE_GENAI_USE_VERTEXAI", None)
@@ -64,11 +115,85 @@ VOICE_CONFIG = types.LiveConnectConfig(
 )
 
 
+class _OutboundQueue(asyncio.Queue):
+    """Bounded queue of outbound frames: bytes are audio, str are JSON text."""
+
+    def __init__(self, maxsize: int = 0):
+        super().__init__(maxsize)
+        self.dropped_audio = 0  # Audio shed since the writer last reported congestion
+
+    def offer(self, frame: bytes) -> bool:
+        """Queue audio now, shedding the oldest audio when full; False if dropped."""
+        if self.full() and not self._drop_oldest_audio():
+            self.dropped_audio += 1
+            return False  # Only text is queued, and text is never shed
+        self.put_nowait(frame)
+        return True
+
+    async def put_text(self, frame: str):
+        """Queue text, shedding the oldest audio to make room, else waiting for it."""
+        if self.full():
+            self._drop_oldest_audio()
+        await self.put(frame)
+
+    def take_run(self, first, max_messages: int, max_bytes: int) -> list:
+        """Collect `first` plus queued frames of the same kind, within both caps."""
+        queue = self._queue
+        kind = type(first)
+        run = [first]
+        size = len(first)
+        while (
+            queue
+            and len(run) < max_messages
+            and type(queue[0]) is kind
+            and size + len(queue[0]) <= max_bytes
+        ):
+            frame = self.get_nowait()
+            run.append(frame)
+            size += len(frame)
+        return run
+
+    def _drop_oldest_audio(self) -> bool:
+        for index, frame in enumerate(self._queue):
+            if isinstance(frame, bytes):
+                del self._queue[index]
+                self.dropped_audio += 1
+                return True
+        return False
+
+
+@dataclass(slots=True)
+class SessionState:
+    """State for one client WebSocket bridged to a Gemini Live session."""
+
+    session: Any
+    session_context: Any
+    websocket: WebSocket
+    out_q: _OutboundQueue
+    last_activity: float
+    connected_at: float
+    ai_response_prefix: str  # Serialized ai_response up to its text value
+    is_running: bool = True
+    retry_count: int = 0
+    breaker_open_until: float = 0.0
+    breaker_window: float = 0.0
+    supervisor: Optional[asyncio.Task] = None
+    # Mic audio awaiting send: a preallocated batch buffer and its fill level
+    tx_buf: bytearray = field(default_factory=lambda: bytearray(TX_FLUSH_BYTES))
+    tx_len: int = 0
+    tx_flush_handle: Optional[asyncio.TimerHandle] = None
+    tx_flush_task: Optional[asyncio.Task] = None
+    text_buf: List[str] = field(default_factory=list)  # Text deltas awaiting flush
+    text_flush_handle: Optional[asyncio.TimerHandle] = None
+    text_flush_task: Optional[asyncio.Task] = None
+
+
 class WebSocketVoiceAgent:
     """PyAudio-free Voice Agent using WebSocket streaming."""
 
     def __init__(self):
-        self.active_sessions: Dict[str, Dict[str, Any]] = {}
+        self.active_sessions: Dict[str, SessionState] = {}
+        self._ts_cache = ("", float("-inf"))
 
     async def create_session(self, session_id: str, websocket: WebSocket):
         """Create a new voice session with WebSocket connection."""
@@ -84,16 +209,6 @@ class WebSocketVoiceAgent:
                 await self._send_error_to_client(websocket, error_msg)
                 return False
 
-            # Validate API key
-            api_key = os.environ.get("GEMINI_API_KEY")
-            if not api_key:
-                error_msg = "GEMINI_API_KEY environment variable is not set"
-                logger.error(f"❌ {error_msg}")
-                await self._send_error_to_client(websocket, error_msg)
-                return False
-
-            logger.info(f"✅ Using API key: {api_key[:10]}...{api_key[-4:]}")
-
             # Create Gemini Live session with proper timeout and error handling
             logger.info(f"🤖 Connecting to Gemini Live API...")
             try:
@@ -117,16 +232,16 @@ class WebSocketVoiceAgent:
                 return False
 
             # Store session data with enhanced tracking
-            self.active_sessions[session_id] = {
-                "session": session,
-                "session_context": session_context,
-                "websocket": websocket,
-                "is_running": True,
-                "audio_queue": asyncio.Queue(maxsize=100),
-                "retry_count": 0,
-                "last_activity": asyncio.get_event_loop().time(),
-                "connected_at": asyncio.get_event_loop().time(),
-            }
+            loop = asyncio.get_running_loop()
+            self.active_sessions[session_id] = SessionState(
+                session=session,
+                session_context=session_context,
+                websocket=websocket,
+                out_q=_OutboundQueue(maxsize=OUTBOUND_QUEUE_SIZE),
+                last_activity=loop.time(),
+                connected_at=loop.time(),
+                ai_response_prefix=self._ai_response_prefix(session_id),
+            )
 
             # Start session tasks
             logger.info(f"🔄 Starting session tasks for {session_id}")
@@ -149,106 +264,206 @@ class WebSocketVoiceAgent:
         """Send error message to client via WebSocket."""
         try:
             await websocket.send_text(
-                json.dumps(
+                orjson.dumps(
                     {
                         "type": "error",
                         "message": error_message,
                         "timestamp": self._get_timestamp(),
                     }
-                )
+                ).decode("utf-8")
             )
             logger.info(f"Sent error to client: {error_message}")
         except Exception as e:
             logger.warning(f"Failed to send error to client: {e}")
 
     async def handle_audio_data(self, session_id: str, audio_data: bytes):
-        """Handle incoming audio data from client."""
+        """Buffer incoming client audio and forward it to Gemini in ~100ms batches."""
         session_data = self.active_sessions.get(session_id)
-        if not session_data or not session_data["is_running"]:
+        if not session_data or not session_data.is_running:
+            return
+
+        # Copy into the fixed-size batch buffer; a full buffer is sent straight away
+        pending = memoryview(audio_data)
+        while pending:
+            start = session_data.tx_len
+            take = min(len(pending), TX_FLUSH_BYTES - start)
+            session_data.tx_buf[start : start + take] = pending[:take]
+            session_data.tx_len = start + take
+            pending = pending[take:]
+            if session_data.tx_len == TX_FLUSH_BYTES:
+                await self._send_tx_audio(session_id, session_data)
+
+        if session_data.tx_len and session_data.tx_flush_handle is None:
+            # Don't hold a short tail back for longer than the flush delay
+            session_data.tx_flush_handle = asyncio.get_running_loop().call_later(
+                TX_FLUSH_DELAY_S, self._start_tx_flush, session_id, session_data
+            )
+
+    def _start_tx_flush(self, session_id: str, session_data: SessionState):
+        """Timer callback: send whatever mic audio is buffered."""
+        session_data.tx_flush_handle = None
+        previous = session_data.tx_flush_task
+        if previous is not None and not previous.done():
+            # Keep one tracked flush in flight; retry once the earlier send is done
+            session_data.tx_flush_handle = asyncio.get_running_loop().call_later(
+                TX_FLUSH_DELAY_S, self._start_tx_flush, session_id, session_data
+            )
+            return
+        session_data.tx_flush_task = asyncio.create_task(
+            self._send_tx_audio(session_id, session_data)
+        )
+
+    async def _send_tx_audio(self, session_id: str, session_data: SessionState):
+        """Send the buffered mic audio to Gemini as one realtime chunk."""
+        if session_data.tx_flush_handle is not None:
+            session_data.tx_flush_handle.cancel()
+            session_data.tx_flush_handle = None
+        if not session_data.is_running:
+            session_data.tx_len = 0
+        if not session_data.tx_len:
+            return
+
+        now = asyncio.get_running_loop().time()
+        if now < session_data.breaker_open_until:
+            # Recent send failure: fail fast until the breaker half-opens
+            session_data.tx_len = 0
             return
 
+        # Snapshot before awaiting so later audio starts a fresh batch
+        audio_data = bytes(memoryview(session_data.tx_buf)[: session_data.tx_len])
+        session_data.tx_len = 0
+
         try:
             # Update last activity timestamp
-            session_data["last_activity"] = asyncio.get_event_loop().time()
+            session_data.last_activity = now
 
             # Check if session is still valid
-            if not session_data.get("session"):
+            if not session_data.session:
                 logger.warning(f"Session {session_id} has no active Gemini session")
                 return
 
             # Send raw PCM audio data to Gemini Live API
-            # The audio data is already in the correct Int16 PCM format from client
-            await session_data["session"].send(input=audio_data)
+            # The audio data is already in the correct Int16 PCM format from client;
+            # a typed Blob on the realtime audio channel skips the SDK's input sniffing
+            await session_data.session.send_realtime_input(
+                audio=types.Blob(data=audio_data, mime_type=PCM_MIME)
+            )
             logger.debug(
                 f"Audio data sent to Gemini for {session_id}: {len(audio_data)} bytes"
             )
 
-            # Reset retry count on successful send
-            session_data["retry_count"] = 0
+            # Reset retry count and close the breaker on successful send
+            session_data.retry_count = 0
+            session_data.breaker_window = 0.0
 
         except Exception as e:
             logger.error(f"Error handling audio data for {session_id}: {e}")
             # Increment retry count and check for session health
-            session_data["retry_count"] = session_data.get("retry_count", 0) + 1
-            if session_data["retry_count"] > 5:
+            session_data.retry_count += 1
+            self._open_send_breaker(session_data, now)
+            if session_data.retry_count > 5:
                 logger.error(
                     f"Too many audio failures for {session_id}, stopping session"
                 )
-                session_data["is_running"] = False
+                session_data.is_running = False
 
     async def handle_text_message(self, session_id: str, message: str):
         """Handle incoming text message from client."""
         session_data = self.active_sessions.get(session_id)
-        if not session_data or not session_data["is_running"]:
+        if not session_data or not session_data.is_running:
             return False
 
+        # End of a spoken turn: audio still buffered must reach Gemini first
+        await self._send_tx_audio(session_id, session_data)
+
+        now = asyncio.get_running_loop().time()
+        if now < session_data.breaker_open_until:
+            return False  # Recent send failure: fail fast until the breaker half-opens
+
         try:
             # Update last activity timestamp
-            session_data["last_activity"] = asyncio.get_event_loop().time()
+            session_data.last_activity = now
 
-            if not session_data.get("session"):
+            if not session_data.session:
                 logger.warning(f"Session {session_id} has no active Gemini session")
                 return False
 
-            await session_data["session"].send(input=message, end_of_turn=True)
+            await session_data.session.send_client_content(
+                turns=[
+                    types.Content(
+                        role="user",
+                        parts=[types.Part.from_text(text=message)],
+                    )
+                ],
+                turn_complete=True,
+            )
             logger.info(
                 f"Text message sent to Gemini for {session_id}: {message[:50]}..."
             )
 
-            # Reset retry count on successful send
-            session_data["retry_count"] = 0
+            # Reset retry count and close the breaker on successful send
+            session_data.retry_count = 0
+            session_data.breaker_window = 0.0
             return True
         except Exception as e:
             logger.error(f"Error sending text message for {session_id}: {e}")
             # Increment retry count and check for session health
-            session_data["retry_count"] = session_data.get("retry_count", 0) + 1
-            if session_data["retry_count"] > 3:
+            session_data.retry_count += 1
+            self._open_send_breaker(session_data, now)
+            if session_data.retry_count > 3:
                 logger.error(
                     f"Too many text failures for {session_id}, stopping session"
                 )
-                session_data["is_running"] = False
+                session_data.is_running = False
             return False
 
+    @staticmethod
+    def _open_send_breaker(session_data: SessionState, now: float):
+        """Skip sends for a window that doubles with each consecutive failure."""
+        session_data.breaker_window = min(
+            SEND_BREAKER_MAX_WINDOW_S,
+            session_data.breaker_window * 2 or SEND_BREAKER_BASE_WINDOW_S,
+        )
+        session_data.breaker_open_until = now + session_data.breaker_window
+
     async def stop_session(self, session_id: str):
         """Stop a voice session."""
         if session_id not in self.active_sessions:
             return
 
         session_data = self.active_sessions[session_id]
-        session_data["is_running"] = False
+        session_data.is_running = False
+        for handle in (session_data.text_flush_handle, session_data.tx_flush_handle):
+            if handle is not None:
+                handle.cancel()
 
         try:
-            # Cancel session tasks
-            if "tasks" in session_data:
-                for task in session_data["tasks"]:
-                    if not task.done():
-                        task.cancel()
-                await asyncio.gather(*session_data["tasks"], return_exceptions=True)
+            # Cancelling the supervisor tears down every session task; timer-started
+            # flushes run outside it and are cancelled alongside
+            current = asyncio.current_task()
+            tasks = {
+                task
+                for task in (
+                    session_data.supervisor,
+                    session_data.text_flush_task,
+                    session_data.tx_flush_task,
+                )
+                if task and task is not current and not task.done()
+            }
+            if tasks:
+                for task in tasks:
+                    task.cancel()
+                # Bounded wait: a task stuck in a send must not stall the stop
+                _, pending = await asyncio.wait(tasks, timeout=STOP_SESSION_TIMEOUT)
+                if pending:
+                    logger.warning(
+                        f"Session tasks still finishing for {session_id}, not waiting"
+                    )
 
             # Close Gemini session
-            if session_data.get("session_context"):
+            if session_data.session_context:
                 try:
-                    await session_data["session_context"].__aexit__(None, None, None)
+                    await session_data.session_context.__aexit__(None, None, None)
                 except Exception as e:
                     logger.warning(f"Error closing Gemini session context: {e}")
 
@@ -261,24 +476,45 @@ class WebSocketVoiceAgent:
             logger.error(f"Error stopping session {session_id}: {e}")
 
     async def _start_session_tasks(self, session_id: str):
-        """Start background tasks for session."""
+        """Start the supervisor task that owns all background tasks of a session."""
         session_data = self.active_sessions[session_id]
+        session_data.supervisor = asyncio.create_task(
+            self._supervise_session(session_id)
+        )
+
+    async def _supervise_session(self, session_id: str):
+        """Run session tasks in one TaskGroup; cancelling this task stops them all."""
+        gemini_closed = False
+        try:
+            async with asyncio.TaskGroup() as tg:
+                responses = tg.create_task(self._handle_responses(session_id))
+                writer = tg.create_task(self._writer_loop(session_id))
+                # The writer idles on its queue, so end it with the response loop
+                responses.add_done_callback(lambda _: writer.cancel())
+        except* Exception as eg:
+            for e in eg.exceptions:
+                logger.error(f"Session task failed for {session_id}: {e}")
+        else:
+            gemini_closed = responses.result()
 
-        # Create response handler task
-        response_task = asyncio.create_task(self._handle_responses(session_id))
-        session_data["tasks"] = [response_task]
+        if gemini_closed:
+            # Gemini closed the session; stop_session skips this (current) task
+            await self.stop_session(session_id)
 
-    async def _handle_responses(self, session_id: str):
-        """Handle responses from Gemini Live API."""
+    async def _handle_responses(self, session_id: str) -> bool:
+        """Handle responses from Gemini Live API; True if Gemini closed the session."""
         session_data = self.active_sessions.get(session_id)
         if not session_data:
-            return
+            return False
 
-        websocket = session_data["websocket"]
+        websocket = session_data.websocket
+        out_q = session_data.out_q
+        consecutive_errors = 0
+        session_closed = False
 
         try:
-            while session_data["is_running"]:
-                if not session_data.get("session"):
+            while session_data.is_running:
+                if not session_data.session:
                     logger.warning(
                         f"No session for {session_id}, stopping response handler"
                     )
@@ -290,106 +526,217 @@ class WebSocketVoiceAgent:
                         logger.info(
                             f"WebSocket closed for {session_id}, stopping response handler"
                         )
-                        session_data["is_running"] = False
+                        session_data.is_running = False
                         break
 
                     # Receive turn from Gemini with timeout
                     try:
-                        turn = session_data["session"].receive()
+                        turn = session_data.session.receive()
 
                         # Process each response in the turn
                         async for response in turn:
-                            if not session_data["is_running"]:
+                            if not session_data.is_running:
                                 break
 
+                            consecutive_errors = 0
+
                             # Double-check WebSocket state
                             if not self._is_websocket_connected(websocket):
                                 logger.info(
                                     f"WebSocket closed during response for {session_id}"
                                 )
-                                session_data["is_running"] = False
+                                session_data.is_running = False
                                 break
 
                             try:
-                                # Handle audio response
-                                if hasattr(response, "data") and response.data:
-                                    # Convert audio data to base64 for transmission
-                                    audio_b64 = base64.b64encode(response.data).decode(
-                                        "utf-8"
-                                    )
+                                # Each property is read once: data/text are computed
+                                # from the message parts on every access
+                                data = getattr(response, "data", None)
+                                text = getattr(response, "text", None)
 
-                                    await websocket.send_text(
-                                        json.dumps(
-                                            {
-                                                "type": "audio_response",
-                                                "session_id": session_id,
-                                                "audio_data": audio_b64,
-                                                "timestamp": self._get_timestamp(),
-                                            }
-                                        )
-                                    )
+                                # Handle audio response
+                                if data:
+                                    # Raw PCM; the writer frames it into its buffer
+                                    out_q.offer(data)
                                     logger.debug(
                                         f"Audio response sent for {session_id}"
                                     )
 
                                 # Handle text response (now possible with TEXT modality enabled)
-                                if hasattr(response, "text") and response.text:
-                                    await websocket.send_text(
-                                        json.dumps(
-                                            {
-                                                "type": "ai_response",
-                                                "session_id": session_id,
-                                                "text": response.text,
-                                                "timestamp": self._get_timestamp(),
-                                            }
-                                        )
-                                    )
-                                    logger.info(
-                                        f"Text response sent for {session_id}: {response.text[:50]}..."
-                                    )
+                                if text:
+                                    self._buffer_text(session_id, session_data, text)
 
                             except Exception as send_error:
                                 logger.warning(
                                     f"Failed to send response for {session_id}: {send_error}"
                                 )
-                                session_data["is_running"] = False
+                                session_data.is_running = False
                                 break
 
+                        # Turn ended: don't hold back its last text
+                        await self._flush_text(session_id, session_data)
+
                     except asyncio.TimeoutError:
-                        # No response within timeout, continue listening
-                        await asyncio.sleep(0.1)
+                        # No response within timeout, back off and keep listening
+                        consecutive_errors += 1
+                        await asyncio.sleep(self._retry_delay(consecutive_errors))
                         continue
 
                 except asyncio.CancelledError:
                     logger.info(f"Response handler cancelled for {session_id}")
                     break
                 except Exception as e:
+                    if self._is_terminal_error(e):
+                        logger.info(
+                            f"Gemini session closed for {session_id}, stopping response handler: {e}"
+                        )
+                        session_data.is_running = False
+                        session_closed = True
+                        break
+
                     # Only log non-connection errors as warnings
                     if "connection" not in str(e).lower():
                         logger.warning(f"Response handling error for {session_id}: {e}")
-                    # Add a small delay to prevent tight error loops
-                    await asyncio.sleep(0.5)
+                    # Back off exponentially to prevent tight error loops
+                    consecutive_errors += 1
+                    await asyncio.sleep(self._retry_delay(consecutive_errors))
 
         except Exception as e:
             logger.error(f"Response handler failed for {session_id}: {e}")
         finally:
             logger.info(f"Response handler ended for {session_id}")
 
+        return session_closed
+
+    def _buffer_text(self, session_id: str, session_data: SessionState, text: str):
+        """Collect text deltas; the first one in a window schedules the flush."""
+        session_data.text_buf.append(text)
+        if session_data.text_flush_handle is None:
+            session_data.text_flush_handle = asyncio.get_running_loop().call_later(
+                TEXT_FLUSH_DELAY_S, self._start_text_flush, session_id, session_data
+            )
+
+    def _start_text_flush(self, session_id: str, session_data: SessionState):
+        """Timer callback: queue whatever text is buffered."""
+        session_data.text_flush_handle = None
+        previous = session_data.text_flush_task
+        if previous is not None and not previous.done():
+            # An earlier flush is still waiting for queue space; retry after it
+            session_data.text_flush_handle = asyncio.get_running_loop().call_later(
+                TEXT_FLUSH_DELAY_S, self._start_text_flush, session_id, session_data
+            )
+            return
+        session_data.text_flush_task = asyncio.create_task(
+            self._flush_text(session_id, session_data)
+        )
+
+    async def _flush_text(self, session_id: str, session_data: SessionState):
+        """Queue the buffered text deltas as a single ai_response."""
+        if session_data.text_flush_handle is not None:
+            session_data.text_flush_handle.cancel()
+            session_data.text_flush_handle = None
+        if not session_data.text_buf:
+            return
+
+        text = "".join(session_data.text_buf)
+        session_data.text_buf.clear()
+        # Only the text and timestamp vary; the rest was serialized at session start
+        await session_data.out_q.put_text(
+            session_data.ai_response_prefix
+            + orjson.dumps(text).decode("utf-8")
+            + ',"timestamp":"'
+            + self._get_timestamp()
+            + '"}'
+        )
+        logger.info(f"Text response sent for {session_id}: {text[:50]}...")
+
+    async def _writer_loop(self, session_id: str):
+        """Send queued frames in size-capped batches: audio binary, JSON as text."""
+        session_data = self.active_sessions.get(session_id)
+        if not session_data:
+            return
+
+        websocket = session_data.websocket
+        out_q = session_data.out_q
+        seq = 0
+        while True:
+            frame = await out_q.get()
+            if out_q.dropped_audio:
+                # Tell the client an audio gap precedes the frames that follow
+                await websocket.send_text(
+                    orjson.dumps(
+                        {
+                            "type": "congestion",
+                            "session_id": session_id,
+                            "dropped_frames": out_q.dropped_audio,
+                            "timestamp": self._get_timestamp(),
+                        }
+                    ).decode("utf-8")
+                )
+                out_q.dropped_audio = 0
+
+            batch = out_q.take_run(
+                frame, OUTBOUND_BATCH_MAX_MESSAGES, OUTBOUND_BATCH_MAX_BYTES
+            )
+            if isinstance(frame, bytes):
+                payload = self._pack_audio_batch(batch, seq)
+                seq += len(batch)
+                await websocket.send_bytes(payload)
+            elif len(batch) == 1:
+                await websocket.send_text(frame)
+            else:
+                # Items are already JSON, so the envelope is plain string assembly
+                await websocket.send_text(
+                    '{"type":"batch","items":[' + ",".join(batch) + "]}"
+                )
+
+    @staticmethod
+    def _pack_audio_batch(batch: List[bytes], seq: int) -> bytes:
+        """Frame PCM messages as header+PCM, numbered from seq, in a single join."""
+        parts = []
+        for pcm in batch:
+            parts.append(
+                FRAME_HEADER.pack(
+                    FRAME_MAGIC, FRAME_TYPE_AUDIO, 0, seq & 0xFFFFFFFF, len(pcm)
+                )
+            )
+            parts.append(pcm)
+            seq += 1
+        return b"".join(parts)
+
+    @staticmethod
+    def _retry_delay(consecutive_errors: int) -> float:
+        """Exponential backoff delay for the response loop."""
+        return min(
+            RESPONSE_RETRY_MAX_DELAY,
+            RESPONSE_RETRY_BASE_DELAY * 2**consecutive_errors,
+        )
+
+    @staticmethod
+    def _is_terminal_error(error: Exception) -> bool:
+        """Check whether an error means the Gemini session is permanently closed."""
+        text = f"{type(error).__name__} {error}".lower()
+        return any(marker in text for marker in TERMINAL_ERROR_MARKERS)
+
+    @staticmethod
+    def _ai_response_prefix(session_id: str) -> str:
+        """Pre-serialize an ai_response message up to its text value."""
+        prefix = orjson.dumps({"type": "ai_response", "session_id": session_id})
+        return prefix[:-1].decode("utf-8") + ',"text":'
+
     def _is_websocket_connected(self, websocket: WebSocket) -> bool:
-        """Check if WebSocket is still connected."""
-        if hasattr(websocket, "client_state"):
-            return websocket.client_state.name == "CONNECTED"
-        elif hasattr(websocket, "state"):
-            return websocket.state == 1  # 1 = OPEN
-        else:
-            # Assume connected if we can't determine state
-            return True
+        """Check if WebSocket is still connected (enum identity, no name lookup)."""
+        return websocket.client_state is WebSocketState.CONNECTED
 
     def _get_timestamp(self):
-        """Get current timestamp."""
-        from datetime import datetime
-
-        return datetime.now().isoformat()
+        """Get current timestamp, cached for bursts of messages within 1ms."""
+        now = time.monotonic()
+        cached, cached_at = self._ts_cache
+        if now - cached_at < TIMESTAMP_RESOLUTION_S:
+            return cached
+        timestamp = datetime.now(timezone.utc).isoformat()
+        self._ts_cache = (timestamp, now)
+        return timestamp
 
 
 # Global service instance
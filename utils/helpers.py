@@ -1,7 +1,8 @@
+import functools
 import json
 import uuid
 from datetime import datetime, timezone
-from typing import Dict, Any, List, TYPE_CHECKING
+from typing import Dict, Any, List, Tuple, TYPE_CHECKING
 from loguru import logger
 import json
 import uuid
@@ -241,22 +242,15 @@ def validate_story_consistency(panels: List[Dict[str, Any]]) -> bool:
     return len(character_names) == 1
 
 
-def create_structured_image_prompt(panel_data: Dict[str, Any]) -> str:
-    """Create a detailed, anime-focused image prompt with STRICT USER INPUT ENFORCEMENT."""
-    character = panel_data.get("character_sheet", {})
-    props = panel_data.get("prop_sheet", {})
-    style = panel_data.get("style_guide", {})
-    dialogue_text = panel_data.get("dialogue_text", "")
-    emotional_tone = panel_data.get("emotional_tone", "neutral")
-    panel_number = panel_data.get("panel_number", 1)
-
-    # CRITICAL: Extract USER'S ACTUAL INPUTS - no defaults that ignore user data
-    char_name = character.get("name", "Character")
-    char_appearance = character.get("appearance", "")
-    char_age = character.get("age", "young adult")
-    char_personality = character.get("personality", "determined and hopeful")
-    char_gender = character.get("gender", "")
+@functools.lru_cache(maxsize=128)
+def _character_specifications(
+    char_name: str, char_gender: str, char_age: str
+) -> Tuple[str, str]:
+    """Build the gender and age sections for a character sheet.
 
+    Every panel of a story shares one character sheet, so these sections are
+    cached on the sheet fields instead of being re-rendered per panel.
+    """
     # 🚨 ULTRA-AGGRESSIVE GENDER ENFORCEMENT 🚨
     gender_specification = ""
     if char_gender.lower() in ["female", "woman", "girl"]:
@@ -289,16 +283,32 @@ def create_structured_image_prompt(panel_data: Dict[str, Any]) -> str:
             f"Adult appearance (26-35 years old) with fully mature facial features"
         )
 
-    # Create character-specific details from user inputs
-    items = props.get("items", ["symbolic item"])
-    environment = props.get("environment", "meaningful setting")
-    lighting = props.get("lighting", "dramatic emotional lighting")
+    return gender_specification, age_specification
 
-    # Get panel-specific framing
-    panel_framing = _get_panel_specific_framing(panel_number, emotional_tone)
+
+@functools.lru_cache(maxsize=64)
+def _story_prompt_prefix(
+    char_name: str,
+    char_gender: str,
+    char_age: str,
+    char_appearance: str,
+    environment: str,
+    items: Tuple[str, ...],
+    lighting: str,
+) -> str:
+    """Render the image prompt prefix that is fixed for a whole story.
+
+    Everything here depends only on the character and prop sheets, so all six
+    panels of a story share one rendering and send byte-identical leading
+    text to the image model, which lets the provider's prompt cache reuse it.
+    Per-panel content must go after this prefix, never inside it.
+    """
+    gender_specification, age_specification = _character_specifications(
+        char_name, char_gender, char_age
+    )
 
     # 🚨 ULTRA-AGGRESSIVE STUDIO GHIBLI PROMPT WITH ABSOLUTE CHARACTER ENFORCEMENT 🚨
-    prompt = f"""🚨 CRITICAL CHARACTER GENERATION - ZERO TOLERANCE FOR ERRORS 🚨
+    return f"""🚨 CRITICAL CHARACTER GENERATION - ZERO TOLERANCE FOR ERRORS 🚨
 CHARACTER: {char_name} ({char_gender.upper()})
 FAILURE TO FOLLOW = COMPLETE GENERATION FAILURE
 
@@ -318,13 +328,6 @@ STUDIO GHIBLI ART STYLE: Soft, organic illustration with watercolor backgrounds
 - **Background:** Beautiful natural environment with atmospheric depth and environmental storytelling
 - **Character Integration:** Character feels naturally part of the environment, not separate from it
 
-**STORY MOMENT - PANEL {panel_number} OF 6:**
-- **Scene Focus:** {panel_framing.get('composition', 'Character in natural setting')}
-- **Camera Angle:** {panel_framing.get('angle', 'Eye-level view')} 
-- **Emotional State:** {emotional_tone} - {char_name}'s face and body language show this emotion naturally
-- **Character Action:** {char_name} {panel_framing.get('focus', 'is integrated meaningfully with the environment')}
-- **Inner Voice:** "{dialogue_text}" - this internal dialogue is reflected in {char_name}'s expression
-
 **ENVIRONMENTAL CONTEXT:**
 - **Setting:** {environment} - rendered in Studio Ghibli's natural, organic style
 - **Props/Elements:** {', '.join(items)} - integrated naturally into the Ghibli-style environment
@@ -339,6 +342,56 @@ STUDIO GHIBLI ART STYLE: Soft, organic illustration with watercolor backgrounds
 - NO futuristic or sci-fi elements unless specifically in user's inputs
 - Character must look EXACTLY the same as in previous panels
 
+⚠️ CRITICAL SUCCESS REQUIREMENT ⚠️
+If the generated character is NOT clearly {char_name} the {char_gender}, the generation has COMPLETELY FAILED.
+
+"""
+
+
+def create_structured_image_prompt(panel_data: Dict[str, Any]) -> str:
+    """Create a detailed, anime-focused image prompt with STRICT USER INPUT ENFORCEMENT."""
+    character = panel_data.get("character_sheet", {})
+    props = panel_data.get("prop_sheet", {})
+    style = panel_data.get("style_guide", {})
+    dialogue_text = panel_data.get("dialogue_text", "")
+    emotional_tone = panel_data.get("emotional_tone", "neutral")
+    panel_number = panel_data.get("panel_number", 1)
+
+    # CRITICAL: Extract USER'S ACTUAL INPUTS - no defaults that ignore user data
+    char_name = character.get("name", "Character")
+    char_appearance = character.get("appearance", "")
+    char_age = character.get("age", "young adult")
+    char_personality = character.get("personality", "determined and hopeful")
+    char_gender = character.get("gender", "")
+
+    # Create character-specific details from user inputs
+    items = props.get("items", ["symbolic item"])
+    environment = props.get("environment", "meaningful setting")
+    lighting = props.get("lighting", "dramatic emotional lighting")
+
+    # Get panel-specific framing
+    panel_framing = _get_panel_specific_framing(panel_number, emotional_tone)
+
+    # Stable story prefix first, per-panel content last (cache-friendly layout).
+    # Sheet values come from LLM JSON and may be dicts or lists, so they are
+    # rendered to str here, as the f-string would, to keep cache keys hashable
+    story_prefix = _story_prompt_prefix(
+        str(char_name),
+        str(char_gender),
+        str(char_age),
+        str(char_appearance) if char_appearance else "",
+        str(environment),
+        tuple(map(str, items)),
+        str(lighting),
+    )
+
+    prompt = f"""{story_prefix}**STORY MOMENT - PANEL {panel_number} OF 6:**
+- **Scene Focus:** {panel_framing.get('composition', 'Character in natural setting')}
+- **Camera Angle:** {panel_framing.get('angle', 'Eye-level view')} 
+- **Emotional State:** {emotional_tone} - {char_name}'s face and body language show this emotion naturally
+- **Character Action:** {char_name} {panel_framing.get('focus', 'is integrated meaningfully with the environment')}
+- **Inner Voice:** "{dialogue_text}" - this internal dialogue is reflected in {char_name}'s expression
+
 🚨 FINAL VERIFICATION CHECKLIST 🚨
 ✅ Character is named {char_name} (not generic name)
 ✅ Character is clearly {char_gender.upper()} with appropriate gender presentation
@@ -346,9 +399,6 @@ STUDIO GHIBLI ART STYLE: Soft, organic illustration with watercolor backgrounds
 ✅ Character shows {emotional_tone} emotion naturally
 ✅ NO gender mixing or character inconsistencies
 
-⚠️ CRITICAL SUCCESS REQUIREMENT ⚠️
-If the generated character is NOT clearly {char_name} the {char_gender}, the generation has COMPLETELY FAILED.
-
 Panel {panel_number}: Studio Ghibli-style scene showing {char_name} ({char_gender}) in a moment of {emotional_tone}, rendered with soft natural beauty and environmental harmony.""".strip()
 
     return prompt
@@ -4,11 +4,25 @@ Exponential backoff retry utilities for Google API rate limiting.
 
 import asyncio
 import random
+import re
 import time
 from typing import Callable, Any, Optional, Union
 from loguru import logger
 from functools import wraps
 
+# Rate limit indicators in Google API error messages, matched in one pass.
+# "quota" already covers "quota_exceeded" and "quota exceeded".
+RATE_LIMIT_KEYWORDS = (
+    "rate limit",
+    "quota",
+    "too many requests",
+    "429",
+    "throttled",
+    "resource_exhausted",
+    "rate_limited",
+)
+RATE_LIMIT_PATTERN = re.compile("|".join(map(re.escape, RATE_LIMIT_KEYWORDS)))
+
 
 class RetryableError(Exception):
     """Base exception for retryable errors."""
@@ -82,22 +96,10 @@ async def exponential_backoff_async(
 
             # Check for specific rate limit indicators
             error_str = str(e).lower()
-            is_rate_limit = any(
-                keyword in error_str
-                for keyword in [
-                    "rate limit",
-                    "quota",
-                    "too many requests",
-                    "429",
-                    "throttled",
-                    "resource_exhausted",
-                    "quota_exceeded",
-                    "rate_limited",
-                ]
-            )
+            is_rate_limit = RATE_LIMIT_PATTERN.search(error_str) is not None
 
             # Special handling for quota exceeded errors
-            is_quota_exceeded = "quota exceeded" in error_str.lower()
+            is_quota_exceeded = "quota exceeded" in error_str
 
             if not is_retryable and not is_rate_limit:
                 logger.warning(f"Non-retryable error encountered: {e}")
@@ -200,19 +202,7 @@ def exponential_backoff_sync(
 
             # Check for specific rate limit indicators
             error_str = str(e).lower()
-            is_rate_limit = any(
-                keyword in error_str
-                for keyword in [
-                    "rate limit",
-                    "quota",
-                    "too many requests",
-                    "429",
-                    "throttled",
-                    "resource_exhausted",
-                    "quota_exceeded",
-                    "rate_limited",
-                ]
-            )
+            is_rate_limit = RATE_LIMIT_PATTERN.search(error_str) is not None
 
             if not is_retryable and not is_rate_limit:
                 logger.warning(f"Non-retryable error encountered: {e}")
@@ -29,6 +29,9 @@ class NanoBananaWorkflowNode:
     def __init__(self):
         self.gemini_api_key = settings.gemini_api_key
         self.image_client = None
+        # Caps in-flight Gemini image calls when panels are generated in parallel;
+        # held per attempt only, so retry backoff never occupies a slot
+        self.image_semaphore = asyncio.Semaphore(settings.max_parallel_panels)
         self._initialize_nano_banana()
 
     def _initialize_nano_banana(self):
@@ -261,15 +264,18 @@ This reference will be used by nano-banana to generate consistent character appe
             # Execute all panels in parallel with nano-banana
             panel_results = await asyncio.gather(*panel_tasks, return_exceptions=True)
 
-            # Process results
-            panel_urls = []
+            # Process results; fallbacks for failed panels are uploaded concurrently
+            panel_urls = list(panel_results)
+            fallback_tasks = {}
             for i, result in enumerate(panel_results):
                 if isinstance(result, Exception):
                     logger.error(f"Nano-banana panel {i+1} generation failed: {result}")
-                    fallback_url = await self._create_fallback_panel(story_id, i + 1)
-                    panel_urls.append(fallback_url)
-                else:
-                    panel_urls.append(result)
+                    fallback_tasks[i] = self._create_fallback_panel(story_id, i + 1)
+
+            if fallback_tasks:
+                fallback_urls = await asyncio.gather(*fallback_tasks.values())
+                for i, fallback_url in zip(fallback_tasks, fallback_urls):
+                    panel_urls[i] = fallback_url
 
             logger.info(f"Generated {len(panel_urls)} panel images with nano-banana")
             return panel_urls
@@ -293,11 +299,8 @@ This reference will be used by nano-banana to generate consistent character appe
             )
 
             response = await exponential_backoff_async(
-                lambda: asyncio.to_thread(
-                    self.image_client.models.generate_content,
-                    model="gemini-2.5-flash-image-preview",
-                    contents=[panel_prompt],
-                ),
+                self._generate_panel_content,
+                panel_prompt,
                 max_retries=5,
                 initial_delay=1.0,
                 max_delay=30.0,
@@ -316,6 +319,15 @@ This reference will be used by nano-banana to generate consistent character appe
             logger.error(f"Failed to generate nano-banana panel {panel_number}: {e}")
             raise
 
+    async def _generate_panel_content(self, panel_prompt: str):
+        """Run one generate_content attempt while holding a panel slot."""
+        async with self.image_semaphore:
+            return await asyncio.to_thread(
+                self.image_client.models.generate_content,
+                model="gemini-2.5-flash-image-preview",
+                contents=[panel_prompt],
+            )
+
     def _create_panel_prompt_nano_banana(
         self, panel_data: Dict, panel_number: int, reference_urls: List[str]
     ) -> str: